@@ -1,56 +1,227 @@
+import time
+
 import discord
 from discord import ApplicationCommand
 from discord.ext import commands
 from loguru import logger
 from prometheus_client import Enum, Gauge, Counter
-from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 
-from ClubDigital import models
-from ClubDigital.metrics import ONLINE_STATE, DATABASE_CONNECTED, COMMAND_COUNT
+from ClubDigital import models, database, cache, startup, writebehind, metrics
+from ClubDigital.scheduler import RestScheduler
+from ClubDigital.members import reconcile_members
+from ClubDigital.metrics import ONLINE_STATE, DATABASE_CONNECTED, COMMAND_COUNT, COMMAND_ERRORS, PROCESS_TIME, \
+    EXTENSION_LOAD_TIME, EXTENSION_RELOAD_TIME
 
-engine = create_engine('sqlite:///../db.sqlite3')
-models.base.setup(engine)
+with startup.phase('database'):
+    models.base.setup(database.engine)
 
 
 ONLINE_STATE.state('starting')
 
+# eager: every member of every guild is cached before on_ready, lazy: a guild is chunked in the background once the
+# first command is used in it, never: only the members of incoming events are known. Without the cache the member sync
+# pages through the REST API.
+MEMBER_CACHE_MODES = ('eager', 'lazy', 'never')
+
 
 class MyContext(commands.Context):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.prj = None
 
-    async def project(self, value: models.Project):
+    async def project(self, value: cache.ProjectRecord | None):
         self.prj = value
 
+    async def send(self, *args, **kwargs) -> discord.Message:
+        # Messages wait in the rate limit bucket of their channel, see `RestScheduler`.
+        return await self.bot.rest.send(self.channel.id, super().send, *args, **kwargs)
+
+
+class ProjektBotBase:
+    """Behaviour that is shared by the single shard and the sharded bot, has to come before the pycord bot class."""
+    def __init__(self, *args, member_cache: str = 'eager', **kwargs):
+        if member_cache not in MEMBER_CACHE_MODES:
+            raise ValueError(f'Unknown member cache mode {member_cache}, use one of {", ".join(MEMBER_CACHE_MODES)}.')
+        self.member_cache = member_cache
+        kwargs.setdefault('chunk_guilds_at_startup', member_cache == 'eager')
+        if member_cache == 'never':
+            kwargs.setdefault('member_cache_flags', discord.MemberCacheFlags.none())
+        super().__init__(*args, **kwargs)
+        # All REST calls of the cogs that can come in bursts go through this scheduler.
+        self.rest = RestScheduler()
+        # The guilds that are chunked or being chunked in lazy mode.
+        self._chunking: set[int] = set()
+        self._parse_member_update = self._connection.parsers['GUILD_MEMBER_UPDATE']
+        self._connection.parsers['GUILD_MEMBER_UPDATE'] = self._parse_uncached_member_update
+        self._parse_member_remove = self._connection.parsers['GUILD_MEMBER_REMOVE']
+        self._connection.parsers['GUILD_MEMBER_REMOVE'] = self._parse_uncached_member_remove
+
+    def _parse_uncached_member_update(self, data: dict):
+        """
+        pycord drops the updates of members that are not cached, they are dispatched as `uncached_member_update`.
+
+        The listeners get the guild and the raw payload, there is no state before the update to compare with.
+        """
+        guild = self._connection._get_guild(int(data['guild_id']))
+        cached = guild is not None and guild.get_member(int(data['user']['id'])) is not None
+        self._parse_member_update(data)
+        if guild is not None and not cached:
+            self.dispatch('uncached_member_update', guild, data)
+
+    def _parse_uncached_member_remove(self, data: dict):
+        """Like `_parse_uncached_member_update`, leaves of uncached members become `uncached_member_remove`."""
+        guild = self._connection._get_guild(int(data['guild_id']))
+        cached = guild is not None and guild.get_member(int(data['user']['id'])) is not None
+        self._parse_member_remove(data)
+        if guild is not None and not cached:
+            self.dispatch('uncached_member_remove', guild, data)
+
+    @property
+    def sees_all_guilds(self) -> bool:
+        """Whether this process is connected to all shards, which is not the case for the workers of a cluster."""
+        shard_ids = getattr(self, 'shard_ids', None)
+        if shard_ids is None and self.shard_id is not None:
+            shard_ids = [self.shard_id]
+        return shard_ids is None or len(set(shard_ids)) >= (self.shard_count or 1)
+
+    async def guild_members(self, guild: discord.Guild) -> list[tuple[str, int, list[int]]]:
+        """The names, ids and role ids of all members of `guild`, except the bot itself."""
+        if guild.chunked:
+            return [(member.name, member.id, [role.id for role in member.roles]) for member in guild.members
+                    if member.name != 'Club-Digital']
+        # The pages of the REST API are not cached, only the names, ids and roles are kept.
+        members = guild.fetch_members(limit=None)
+        return [(member.name, member.id, [role.id for role in member.roles]) async for member in members
+                if member.name != 'Club-Digital']
+
+    def chunk_later(self, guild: discord.Guild | None):
+        """In lazy mode, starts to cache the members of `guild` in the background, if that did not happen yet."""
+        if self.member_cache != 'lazy' or guild is None or guild.chunked or guild.id in self._chunking:
+            return
+        self._chunking.add(guild.id)
+        self.loop.create_task(self._chunk(guild))
+
+    async def _chunk(self, guild: discord.Guild):
+        try:
+            await guild.chunk()
+        except Exception as e:
+            # The next command tries again.
+            logger.warning(f'Could not chunk the guild {guild.name} - {guild.id}: {e}')
+            self._chunking.discard(guild.id)
 
-class ProjektBot(commands.Bot):
     async def register_command(self, command: ApplicationCommand, force: bool = True,
                                guild_ids: list[int] | None = None) -> None:
         await super().register_command(command, force, guild_ids)
 
+    def load_extension(self, name: str, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().load_extension(name, *args, **kwargs)
+        finally:
+            EXTENSION_LOAD_TIME.labels(name).set(time.perf_counter() - start)
+
+    def reload_extension(self, name: str, **kwargs):
+        """
+        Reloads an extension in place, without reconnecting.
+
+        Cogs can hand their in-memory state to their successor: `export_state()` is called on the old instance before
+        it is unloaded, the returned dict is passed to `import_state(state)` of the new instance. If the new code
+        fails to load, pycord restores the old extension and the state goes back to it.
+        """
+        lib = self.extensions.get(name)
+        if lib is None:
+            return super().reload_extension(name, **kwargs)
+        start = time.perf_counter()
+        cogs = [cog for cog in self.cogs.values()
+                if type(cog).__module__ == name or type(cog).__module__.startswith(name + '.')]
+        states = {cog.qualified_name: cog.export_state() for cog in cogs if hasattr(cog, 'export_state')}
+        # The module is executed again and would register its metrics a second time.
+        collectors = metrics.defined_in(lib)
+        metrics.unregister(collectors)
+        try:
+            with metrics.recording() as created:
+                super().reload_extension(name, **kwargs)
+        except Exception:
+            # pycord went back to the old module, so its metrics replace the ones that the failed code created.
+            metrics.unregister(created)
+            metrics.register(collectors)
+            raise
+        finally:
+            for cog_name, state in states.items():
+                cog = self.get_cog(cog_name)
+                if cog is not None and hasattr(cog, 'import_state'):
+                    cog.import_state(state)
+            # Unloading only drops the registered application commands, the instances of the old cogs are still pending.
+            self._pending_application_commands = [command for command in self._pending_application_commands
+                                                  if command.cog not in cogs]
+            duration = time.perf_counter() - start
+            EXTENSION_RELOAD_TIME.labels(name).observe(duration)
+            logger.info(f'Reloading {name} took {duration * 1000:.1f} ms.')
+        if self.auto_sync_commands and self.is_ready():
+            # pycord only registers the application commands with Discord on connect, changed ones would be missing.
+            self.loop.create_task(self.sync_commands())
+
+    def load_extensions(self, *names: str, **kwargs):
+        with startup.phase('extensions'):
+            return super().load_extensions(*names, **kwargs)
+
+    async def login(self, token: str):
+        startup.mark('login')
+        await super().login(token)
+
+    async def on_connect(self):
+        startup.mark('connect', since='login')
+        await super().on_connect()
+
+    async def close(self):
+        await writebehind.flush_all()
+        await super().close()
+
     async def get_context(self, message: discord.Message, *, cls=MyContext):
         return await super().get_context(message, cls=cls)
 
+    @staticmethod
+    def command_labels(ctx: commands.Context) -> tuple[str, str]:
+        cog = ctx.command.cog.qualified_name if ctx.command.cog else ''
+        return cog, ctx.command.qualified_name
+
+    async def invoke(self, ctx: commands.Context):
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        # The command itself resolves its members without the cache, the later ones find them there.
+        self.chunk_later(ctx.guild)
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            # Groups resolve their subcommand while they are invoked, afterwards `ctx.command` is the subcommand.
+            labels = self.command_labels(ctx)
+            PROCESS_TIME.labels(*labels).observe(time.perf_counter() - start)
+            COMMAND_COUNT.labels(*labels).inc()
+
+    async def on_command_error(self, ctx: commands.Context, exception: commands.CommandError):
+        if ctx.command is not None:
+            COMMAND_ERRORS.labels(*self.command_labels(ctx)).inc()
+        await super().on_command_error(ctx, exception)
+
     async def on_ready(self):
+        startup.mark('ready', since='connect')
         logger.info(f'Logged in as: {self.user}')
         logger.info('Joined to:')
-        with Session(engine) as session:
-            DATABASE_CONNECTED.set(1)
-            for guild in self.guilds:
-                logger.info(f'    {guild.name} - {guild.id}')
-                for user in guild.members:
-                    # logging.info(f'        {user.name}')
-                    # print(user.__dir__())
-                    if user.name == 'Club-Digital':
-                        continue
-                    instance = session.query(models.User).filter_by(username=user.name).first()
-                    if not instance:
-                        logger.info(f'Enlisted {user.name}#{user.id} into user database.')
-                        session.add(models.User(user.name, user.id))
-                session.commit()
-            DATABASE_CONNECTED.set(0)
+        DATABASE_CONNECTED.set(1)
+        members, roles = [], set()
+        for guild in self.guilds:
+            logger.info(f'    {guild.name} - {guild.id}')
+            members.extend(await self.guild_members(guild))
+            roles.update(role.id for role in guild.roles)
+        # The gateway does not replay the member events that were missed while the bot was offline, so all members
+        # of all guilds are compared with the database at once. A user that only left one of the guilds keeps the
+        # project. Users are only removed if this process sees all guilds, see `reconcile_members`.
+        await database.run_session(database.engine, reconcile_members, members, roles, self.sees_all_guilds)
+        DATABASE_CONNECTED.set(0)
+        startup.mark('member_sync', since='ready')
+        startup.mark('total')
         ONLINE_STATE.state('online')
 
     async def on_disconnect(self):
@@ -61,5 +232,10 @@ class ProjektBot(commands.Bot):
         logger.info('Bot resumed normal operation')
         ONLINE_STATE.state('online')
 
-    async def on_command(self, ctx):
-        COMMAND_COUNT.inc(1)
+
+class ProjektBot(ProjektBotBase, commands.Bot):
+    pass
+
+
+class ShardedProjektBot(ProjektBotBase, commands.AutoShardedBot):
+    pass
@@ -0,0 +1,104 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+from ClubDigital import models
+from ClubDigital.metrics import CACHE_HITS, CACHE_MISSES
+
+MISSING = object()
+
+
+@dataclass(frozen=True)
+class UserRecord:
+    id: int
+    username: str
+    dc_id: int
+    project_id: int | None
+
+    @classmethod
+    def of(cls, user: models.User | None):
+        if user is None:
+            return None
+        return cls(user.id, user.username, user.dc_id, user.project_id)
+
+
+@dataclass(frozen=True)
+class ProjectRecord:
+    id: int
+    name: str
+    description: str | None
+    leader: int | None
+    role: int
+    leader_role: int
+    color: str
+
+    @classmethod
+    def of(cls, project: models.Project | None):
+        if project is None:
+            return None
+        return cls(project.id, project.name, project.description, project.leader, project.role,
+                   project.leader_role, project.color)
+
+
+class LRUCache:
+    """
+    A bounded cache, that evicts the least recently used entry and forgets entries after `ttl` seconds.
+
+    The cache is not thread safe and must only be used on the event loop.
+    """
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        """Returns the cached value or `MISSING`. `None` is a valid value and means that the row does not exist."""
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            CACHE_MISSES.labels(self.name).inc()
+            return MISSING
+        self._data.move_to_end(key)
+        CACHE_HITS.labels(self.name).inc()
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> Any:
+        """Removes the entry and returns the value that was cached, if there was one."""
+        entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+users = LRUCache('users')
+projects = LRUCache('projects')
+project_names = LRUCache('project_names')
+
+
+def put_project(project: ProjectRecord):
+    projects.put(project.id, project)
+    project_names.put(project.name, project)
+
+
+def invalidate_project(project_id: int | None = None, name: str | None = None):
+    if project_id is not None:
+        cached = projects.invalidate(project_id)
+        if cached:
+            project_names.invalidate(cached.name)
+    if name is not None:
+        cached = project_names.invalidate(name)
+        if cached:
+            projects.invalidate(cached.id)
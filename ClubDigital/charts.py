@@ -0,0 +1,68 @@
+import asyncio
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy
+from loguru import logger
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def render_latency_chart(timestamps: numpy.ndarray, values: numpy.ndarray, minimum: numpy.ndarray | None = None,
+                         maximum: numpy.ndarray | None = None) -> bytes:
+    """
+    Draws the latency history and returns it as PNG. This runs in a worker process.
+
+    For downsampled values `minimum` and `maximum` are drawn as a band around the average.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.style.use('dark_background')
+    fig, plot = plt.subplots()
+    dates = timestamps.astype('datetime64[ms]')
+    if minimum is not None and maximum is not None:
+        plot.fill_between(dates, minimum, maximum, alpha=0.3)
+    plot.plot(dates, values)
+    fig.autofmt_xdate()
+    image = io.BytesIO()
+    fig.savefig(image, format='png', dpi=100, transparent=False)
+    plt.close(fig)
+    return image.getvalue()
+
+
+def _worker() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # A forked worker would inherit the sockets and threads of the bot, a fresh interpreter starts without them.
+        _executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('forkserver'))
+    return _executor
+
+
+async def render(func, *args) -> bytes:
+    """
+    Runs a chart function in the worker process, so the event loop keeps running while matplotlib draws.
+
+    If the worker process died, e.g. killed by the OOM killer, a new one is started and the chart is drawn once more.
+    """
+    global _executor
+    loop = asyncio.get_running_loop()
+    executor = _worker()
+    try:
+        return await loop.run_in_executor(executor, func, *args)
+    except BrokenProcessPool:
+        logger.warning('The chart worker process died, starting a new one.')
+        if _executor is executor:
+            executor.shutdown(wait=False)
+            _executor = None
+    return await loop.run_in_executor(_worker(), func, *args)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,370 @@
+"""
+Bulk import and export of projects, repositories and users.
+
+    poetry run python ClubDigital/cli.py export users users.csv
+    poetry run python ClubDigital/cli.py import projects projects.jsonl --dry-run
+
+The format follows the file extension (`.csv` or `.jsonl`), `-` reads from stdin or writes to stdout in the format
+given with `--format`. The rows reference each other by name instead of database ids (projects by their name, users
+by their Discord id), so a file can be moved between databases. Projects should be imported before their
+repositories and users, the leaders of projects are only found once the users exist.
+
+The rows are read and written in chunks, so the memory use does not depend on the size of the file. An import adds
+the rows that are new and updates the ones that changed, columns that are missing in the file are left untouched.
+With `--dry-run` the differences are printed instead. The running bot caches users and projects for up to five
+minutes. Imported projects are added to its project index the first time they are used, autocomplete and suggestions
+know all of them after `!reload project`. When the bot starts, it derives the memberships and leaders of projects whose
+roles exist on the guild from the Discord roles, imported values that contradict the roles are overwritten then.
+"""
+import abc
+import argparse
+import csv
+import itertools
+import json
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, TextIO
+
+from loguru import logger
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+
+from ClubDigital import models, database
+
+CHUNK_SIZE = 1000
+FORMATS = ('csv', 'jsonl')
+
+
+def _optional(convert: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """Empty CSV cells and JSON nulls become `None`."""
+    return lambda value: None if value is None or value == '' else convert(value)
+
+
+@dataclass
+class ImportResult:
+    added: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+
+    @property
+    def rows(self) -> int:
+        return self.added + self.changed + self.unchanged + self.skipped
+
+
+class Table(abc.ABC):
+    """
+    The mapping between the rows of a file and one table.
+
+    `key` are the columns that identify a row in the file, `columns` all columns of the file with their converters.
+    """
+    name: str
+    model: type
+    key: tuple[str, ...]
+    columns: dict[str, Callable[[Any], Any]]
+
+    @abc.abstractmethod
+    def export(self, session: Session, chunk_size: int) -> Iterator[dict]:
+        pass
+
+    @abc.abstractmethod
+    def current(self, session: Session, rows: list[dict]) -> dict[tuple, tuple[int, dict]]:
+        """Loads the rows of the database that match the keys of `rows`, as `key -> (id, row)`."""
+
+    def references(self, session: Session, rows: list[dict]) -> dict[str, dict]:
+        """Loads the ids of the rows that the file references by name."""
+        return {}
+
+    @abc.abstractmethod
+    def values(self, row: dict, references: dict[str, dict]) -> dict | None:
+        """Converts a row of the file to the columns of the table. Returns `None`, if a reference is unknown."""
+
+    def parse(self, row: dict) -> dict:
+        unknown = row.keys() - self.columns.keys()
+        if unknown:
+            raise ValueError(f'Unknown columns for {self.name}: {", ".join(sorted(unknown))}')
+        return {column: convert(row[column]) for column, convert in self.columns.items() if column in row}
+
+    def identify(self, row: dict) -> tuple:
+        return tuple(row.get(column) for column in self.key)
+
+
+class Projects(Table):
+    name = 'projects'
+    model = models.Project
+    key = ('name',)
+    columns = {'name': str, 'description': _optional(str), 'color': _optional(str), 'role': int, 'leader_role': int,
+               'leader': _optional(int)}
+
+    def export(self, session: Session, chunk_size: int) -> Iterator[dict]:
+        leader = aliased(models.User)
+        query = session.query(models.Project.name, models.Project.description, models.Project.color,
+                              models.Project.role, models.Project.leader_role, leader.dc_id) \
+            .outerjoin(leader, models.Project.leader == leader.id).order_by(models.Project.id)
+        for row in query.yield_per(chunk_size):
+            yield dict(zip(self.columns, row))
+
+    def current(self, session: Session, rows: list[dict]) -> dict[tuple, tuple[int, dict]]:
+        leader = aliased(models.User)
+        query = session.query(models.Project.id, models.Project.name, models.Project.description,
+                              models.Project.color, models.Project.role, models.Project.leader_role, leader.dc_id) \
+            .outerjoin(leader, models.Project.leader == leader.id) \
+            .filter(models.Project.name.in_({row['name'] for row in rows}))
+        return {(row[1],): (row[0], dict(zip(self.columns, row[1:]))) for row in query}
+
+    def references(self, session: Session, rows: list[dict]) -> dict[str, dict]:
+        leaders = {row['leader'] for row in rows if row.get('leader') is not None}
+        return {'leader': dict(session.query(models.User.dc_id, models.User.id)
+                               .filter(models.User.dc_id.in_(leaders)))}
+
+    def values(self, row: dict, references: dict[str, dict]) -> dict | None:
+        values = {column: value for column, value in row.items() if column != 'leader'}
+        if 'color' in values and values['color'] is None:
+            values['color'] = models.Project.color.default.arg
+        if 'leader' in row:
+            values['leader'] = references['leader'].get(row['leader'])
+            if row['leader'] is not None and values['leader'] is None:
+                logger.warning(f'The leader {row["leader"]} of {row["name"]} is unknown, import the users first.')
+        return values
+
+
+class Repos(Table):
+    name = 'repos'
+    model = models.Repo
+    key = ('project', 'label')
+    columns = {'project': str, 'label': str, 'link': str}
+
+    def export(self, session: Session, chunk_size: int) -> Iterator[dict]:
+        query = session.query(models.Project.name, models.Repo.label, models.Repo.link) \
+            .join(models.Project, models.Repo.project == models.Project.id).order_by(models.Repo.id)
+        for row in query.yield_per(chunk_size):
+            yield dict(zip(self.columns, row))
+
+    def current(self, session: Session, rows: list[dict]) -> dict[tuple, tuple[int, dict]]:
+        query = session.query(models.Repo.id, models.Project.name, models.Repo.label, models.Repo.link) \
+            .join(models.Project, models.Repo.project == models.Project.id) \
+            .filter(models.Project.name.in_({row['project'] for row in rows}))
+        return {(row[1], row[2]): (row[0], dict(zip(self.columns, row[1:]))) for row in query}
+
+    def references(self, session: Session, rows: list[dict]) -> dict[str, dict]:
+        return {'project': dict(session.query(models.Project.name, models.Project.id)
+                                .filter(models.Project.name.in_({row['project'] for row in rows})))}
+
+    def values(self, row: dict, references: dict[str, dict]) -> dict | None:
+        project = references['project'].get(row['project'])
+        if project is None:
+            logger.warning(f'Skipped the repository {row["label"]}, the project {row["project"]} does not exist.')
+            return None
+        return row | {'project': project}
+
+
+class Users(Table):
+    name = 'users'
+    model = models.User
+    key = ('dc_id',)
+    columns = {'dc_id': int, 'username': str, 'project': _optional(str), 'birth_year': _optional(int),
+               'class_name': _optional(str)}
+
+    def export(self, session: Session, chunk_size: int) -> Iterator[dict]:
+        query = session.query(models.User.dc_id, models.User.username, models.Project.name, models.User.birth_year,
+                              models.User.class_name) \
+            .outerjoin(models.Project, models.User.project_id == models.Project.id).order_by(models.User.id)
+        for row in query.yield_per(chunk_size):
+            yield dict(zip(self.columns, row))
+
+    def current(self, session: Session, rows: list[dict]) -> dict[tuple, tuple[int, dict]]:
+        query = session.query(models.User.id, models.User.dc_id, models.User.username, models.Project.name,
+                              models.User.birth_year, models.User.class_name) \
+            .outerjoin(models.Project, models.User.project_id == models.Project.id) \
+            .filter(models.User.dc_id.in_({row['dc_id'] for row in rows}))
+        return {(row[1],): (row[0], dict(zip(self.columns, row[1:]))) for row in query}
+
+    def references(self, session: Session, rows: list[dict]) -> dict[str, dict]:
+        projects = {row['project'] for row in rows if row.get('project') is not None}
+        names = {row['username'] for row in rows if 'username' in row}
+        return {'project': dict(session.query(models.Project.name, models.Project.id)
+                                .filter(models.Project.name.in_(projects))),
+                'username': dict(session.query(models.User.username, models.User.dc_id)
+                                 .filter(models.User.username.in_(names)))}
+
+    def values(self, row: dict, references: dict[str, dict]) -> dict | None:
+        owner = references['username'].get(row.get('username'))
+        if owner is not None and owner != row['dc_id']:
+            logger.warning(f'Skipped {row["username"]}#{row["dc_id"]}, the username is already taken by {owner}.')
+            return None
+        values = {column: value for column, value in row.items() if column != 'project'}
+        if 'project' in row:
+            values['project_id'] = references['project'].get(row['project'])
+            if row['project'] is not None and values['project_id'] is None:
+                logger.warning(f'Skipped {row.get("username", row["dc_id"])}, the project {row["project"]} does not '
+                               f'exist.')
+                return None
+        if 'username' in row:
+            # Later rows of the same chunk must not take the name again, the insert would fail on the unique name.
+            references['username'][row['username']] = row['dc_id']
+        return values
+
+
+TABLES: dict[str, Table] = {table.name: table for table in (Projects(), Repos(), Users())}
+
+
+def read_rows(file: TextIO, fmt: str) -> Iterator[dict]:
+    if fmt == 'csv':
+        yield from csv.DictReader(file)
+    else:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_rows(file: TextIO, fmt: str, columns: Iterable[str], rows: Iterable[dict]) -> int:
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(file, fieldnames=list(columns))
+        writer.writeheader()
+        for count, row in enumerate(rows, 1):
+            writer.writerow(row)
+    else:
+        for count, row in enumerate(rows, 1):
+            file.write(json.dumps(row, ensure_ascii=False) + '\n')
+    return count
+
+
+def chunked(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, size)):
+        yield chunk
+
+
+def _describe(row: dict) -> str:
+    return ' '.join(f'{column}={value!r}' for column, value in row.items())
+
+
+def import_chunk(session: Session, table: Table, rows: list[dict], result: ImportResult,
+                 diff: TextIO | None = None, dry_run: bool = False):
+    """
+    Adds and updates the rows of one chunk.
+
+    A later row with the same key replaces an earlier one, the replaced row counts as skipped.
+    """
+    unique = {table.identify(row): row for row in map(table.parse, rows)}
+    result.skipped += len(rows) - len(unique)
+    rows = list(unique.values())
+    current = table.current(session, rows)
+    references = table.references(session, rows)
+    added, changed = [], []
+    for row in rows:
+        key = table.identify(row)
+        if key in current:
+            row_id, old = current[key]
+            changes = {column: (old[column], value) for column, value in row.items() if old[column] != value}
+            if not changes:
+                result.unchanged += 1
+                continue
+            values = table.values(row, references)
+            if values is None:
+                result.skipped += 1
+                continue
+            changed.append(values | {'id': row_id})
+            if diff:
+                diff.write(f'~ {table.name} {" ".join(map(str, key))} '
+                           + ' '.join(f'{column}: {old!r} -> {new!r}' for column, (old, new) in changes.items())
+                           + '\n')
+        else:
+            values = table.values(row, references)
+            if values is None:
+                result.skipped += 1
+                continue
+            added.append(values)
+            if diff:
+                diff.write(f'+ {table.name} {_describe(row)}\n')
+    result.added += len(added)
+    result.changed += len(changed)
+    if dry_run:
+        return
+    # The rows of a JSONL file can have different columns, every statement needs the same ones.
+    for _, group in itertools.groupby(added, key=sorted):
+        session.execute(insert(table.model.__table__), list(group))
+    if changed:
+        session.bulk_update_mappings(table.model, changed)
+    session.commit()
+
+
+def import_rows(session: Session, table: Table, rows: Iterable[dict], chunk_size: int = CHUNK_SIZE,
+                diff: TextIO | None = None, dry_run: bool = False) -> ImportResult:
+    """
+    Imports the rows in chunks of `chunk_size`, every chunk is committed on its own.
+
+    The added and changed rows are written to `diff`, if it is given. With `dry_run` nothing is written to the
+    database, a key that appears again in a later chunk is then reported twice.
+    """
+    result = ImportResult()
+    for chunk in chunked(rows, chunk_size):
+        import_chunk(session, table, chunk, result, diff, dry_run)
+    if dry_run:
+        session.rollback()
+    return result
+
+
+def export_rows(session: Session, table: Table, file: TextIO, fmt: str, chunk_size: int = CHUNK_SIZE) -> int:
+    return write_rows(file, fmt, table.columns, table.export(session, chunk_size))
+
+
+def detect_format(path: str, fmt: str | None) -> str:
+    if fmt:
+        return fmt
+    suffix = path.rsplit('.', 1)[-1].lower()
+    if path == '-' or suffix not in FORMATS:
+        raise SystemExit(f'Cannot tell the format of {path}, use --format {"|".join(FORMATS)}.')
+    return suffix
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('action', choices=['import', 'export'])
+    parser.add_argument('table', choices=list(TABLES))
+    parser.add_argument('file', help='CSV or JSONL file, - for stdin or stdout.')
+    parser.add_argument('--format', choices=FORMATS, help='Defaults to the extension of the file.')
+    parser.add_argument('--database', default=database.DATABASE_URL, help='SQLAlchemy URL of the database.')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows per query and transaction.')
+    parser.add_argument('--dry-run', action='store_true', help='Print the differences instead of importing.')
+    args = parser.parse_args(argv)
+
+    fmt = detect_format(args.file, args.format)
+    table = TABLES[args.table]
+    engine = database.create_engine(args.database)
+    models.base.setup(engine)
+    start = time.perf_counter()
+    with Session(engine) as session:
+        if args.action == 'export':
+            if args.file == '-':
+                rows = export_rows(session, table, sys.stdout, fmt, args.chunk_size)
+            else:
+                with open(args.file, 'w', newline='', encoding='utf-8') as file:
+                    rows = export_rows(session, table, file, fmt, args.chunk_size)
+            duration = time.perf_counter() - start
+            logger.info(f'Exported {rows} {table.name} in {duration:.2f} s ({rows / max(duration, 1e-9):.0f} rows/s).')
+            return
+
+        diff = sys.stdout if args.dry_run else None
+        file = sys.stdin if args.file == '-' else open(args.file, newline='', encoding='utf-8')
+        try:
+            result = import_rows(session, table, read_rows(file, fmt), args.chunk_size, diff, args.dry_run)
+        except (ValueError, KeyError, IntegrityError) as e:
+            # The chunks before the failing one are already committed.
+            logger.error(f'The import of {table.name} failed: {e}')
+            raise SystemExit(1)
+        finally:
+            if file is not sys.stdin:
+                file.close()
+    duration = time.perf_counter() - start
+    logger.info(f'{"Checked" if args.dry_run else "Imported"} {result.rows} {table.name} in {duration:.2f} s '
+                f'({result.rows / max(duration, 1e-9):.0f} rows/s): {result.added} added, {result.changed} changed, '
+                f'{result.unchanged} unchanged, {result.skipped} skipped.')
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
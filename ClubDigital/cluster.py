@@ -0,0 +1,97 @@
+import asyncio
+import multiprocessing
+import multiprocessing.connection
+import os
+import pathlib
+import tempfile
+import time
+from typing import Callable
+
+import discord
+from loguru import logger
+from prometheus_client import CollectorRegistry, start_http_server, multiprocess
+
+# Seconds to wait before a crashed worker is started again, so a broken setup does not end in a restart loop.
+RESTART_DELAY = 5
+
+
+def shard_ranges(shard_count: int, workers: int) -> list[list[int]]:
+    """Splits the shards into `workers` contiguous ranges of (almost) the same size."""
+    size, rest = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for worker in range(workers):
+        end = start + size + (1 if worker < rest else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+async def recommended_shard_count(token: str) -> int:
+    """Asks Discord how many shards the bot should use."""
+    http = discord.http.HTTPClient()
+    try:
+        await http.static_login(token)
+        shards, _ = await http.get_bot_gateway()
+        return shards
+    finally:
+        await http.close()
+
+
+def _prepare_metrics() -> pathlib.Path:
+    """
+    Puts prometheus_client of the workers into multiprocess mode.
+
+    Has to happen before the workers are started, because prometheus_client reads the directory when it is imported.
+    """
+    path = pathlib.Path(os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', tempfile.mkdtemp(prefix='clubdigital-')))
+    path.mkdir(parents=True, exist_ok=True)
+    for stale in path.glob('*.db'):
+        stale.unlink()
+    return path
+
+
+def run(target: Callable[[list[int], int], None], token: str, workers: int | None = None,
+        shard_count: int | None = None, port: int = 9910):
+    """
+    Runs `target(shard_ids, shard_count)` in one process per worker and serves the metrics of all workers.
+
+    Workers that crash are started again, workers that exit normally are not.
+    """
+    path = _prepare_metrics()
+    shard_count = shard_count or asyncio.run(recommended_shard_count(token))
+    workers = max(1, min(workers or os.cpu_count() or 1, shard_count))
+    logger.info(f'Starting {workers} workers for {shard_count} shards, metrics are collected in {path}.')
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
+
+    context = multiprocessing.get_context('spawn')
+    processes: dict[int, tuple[multiprocessing.Process, list[int]]] = {}
+
+    def start(shard_ids: list[int]):
+        process = context.Process(target=target, args=(shard_ids, shard_count),
+                                  name=f'shards-{shard_ids[0]}-{shard_ids[-1]}')
+        process.start()
+        processes[process.sentinel] = process, shard_ids
+        logger.info(f'Worker {process.pid} runs the shards {shard_ids[0]} to {shard_ids[-1]}.')
+
+    for shard_ids in shard_ranges(shard_count, workers):
+        start(shard_ids)
+    try:
+        while processes:
+            for sentinel in multiprocessing.connection.wait(list(processes)):
+                process, shard_ids = processes.pop(sentinel)
+                process.join()
+                multiprocess.mark_process_dead(process.pid)
+                if process.exitcode == 0:
+                    logger.info(f'Worker {process.pid} stopped.')
+                else:
+                    logger.error(f'Worker {process.pid} crashed with exit code {process.exitcode}, restarting it.')
+                    time.sleep(RESTART_DELAY)
+                    start(shard_ids)
+    finally:
+        for process, _ in processes.values():
+            process.terminate()
+            process.join()
+            multiprocess.mark_process_dead(process.pid)
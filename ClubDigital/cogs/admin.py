@@ -0,0 +1,56 @@
+import time
+
+import discord
+from discord.ext import commands
+from loguru import logger
+
+
+class Admin(commands.Cog):
+    """
+    Wartung des laufenden Bots, nur für den Besitzer.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        logger.info('Cog: "Admin" has been initialized.')
+
+    async def cog_check(self, ctx: commands.Context) -> bool:
+        if not await self.bot.is_owner(ctx.author):
+            raise commands.NotOwner('Only the owner of the bot can use the admin commands.')
+        return True
+
+    def resolve(self, name: str) -> str | None:
+        """Finds the loaded extension, `project` is accepted as well as `cogs.project`."""
+        if name in self.bot.extensions:
+            return name
+        matches = [extension for extension in self.bot.extensions if extension.rsplit('.', 1)[-1] == name]
+        return matches[0] if len(matches) == 1 else None
+
+    @commands.command()
+    async def reload(self, ctx, *extensions: str):
+        """
+        Lädt Erweiterungen neu, ohne den Bot neu zu starten.
+
+        Ohne Angabe werden alle Erweiterungen neu geladen, z.B. `!reload project`. Caches und gesammelte Daten bleiben
+        erhalten.
+        """
+        names = [self.resolve(extension) for extension in extensions] if extensions else list(self.bot.extensions)
+        message = ''
+        for extension, name in zip(extensions or names, names):
+            if name is None:
+                message += f'Die Erweiterung `{extension}` ist nicht geladen.\n'
+                continue
+            start = time.perf_counter()
+            try:
+                self.bot.reload_extension(name)
+            except Exception as e:
+                logger.exception(f'Could not reload {name}.')
+                message += f'`{name}` konnte nicht neu geladen werden, die alte Version läuft weiter: {e}\n'
+                continue
+            message += f'`{name}` wurde in {(time.perf_counter() - start) * 1000:.0f} ms neu geladen.\n'
+        await ctx.send(message)
+
+
+def setup(bot: discord.Bot):
+    for cog in [Admin]:
+        logger.info(f'Registering {cog.__name__} ...')
+        bot.add_cog(cog(bot))
@@ -0,0 +1,76 @@
+import asyncio
+import copy
+import io
+import re
+
+import discord
+from discord.ext import commands
+from loguru import logger
+
+from ClubDigital import profiling
+
+# Number of functions in the table of `!debug profile`.
+TOP_FUNCTIONS = 15
+
+
+class Debug(commands.Cog):
+    """
+    Fehlersuche im laufenden Bot, nur für den Besitzer.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        # Only one profiler can be active on a thread at a time.
+        self._profiling = asyncio.Lock()
+        logger.info('Cog: "Debug" has been initialized.')
+
+    async def cog_check(self, ctx: commands.Context) -> bool:
+        if not await self.bot.is_owner(ctx.author):
+            raise commands.NotOwner('Only the owner of the bot can use the debug commands.')
+        return True
+
+    @commands.group()
+    async def debug(self, ctx):
+        """
+        Werkzeuge zur Fehlersuche.
+        """
+        if ctx.invoked_subcommand is None:
+            await ctx.send_help(ctx.command)
+
+    @debug.command()
+    async def profile(self, ctx, *, command: str):
+        """
+        Führt einen Befehl einmal mit Profiler aus, z.B. `!debug profile project ls`.
+
+        Die Antwort enthält die Funktionen, die am meisten Zeit gebraucht haben, die Anzahl der SQL-Befehle und der
+        Anfragen an Discord und das Profil als Datei, die z.B. mit snakeviz angesehen werden kann. Die Zählung der
+        SQL-Befehle und Anfragen gehört nur zu dem Befehl, die Funktionen enthalten alles, was in der Zeit im Bot lief.
+        """
+        message = copy.copy(ctx.message)
+        message.content = f'{ctx.prefix}{command}'
+        target = await self.bot.get_context(message)
+        if target.command is None:
+            await ctx.send(f'Den Befehl `{command}` kenne ich nicht.')
+            return
+
+        async with self._profiling:
+            with profiling.count_requests(self.bot.http), profiling.profile() as result:
+                await self.bot.invoke(target)
+        logger.info(f'Profiled "{command}": {result.duration * 1000:.1f} ms, '
+                    f'{sum(result.statements.values())} statements, {sum(result.requests.values())} requests.')
+
+        statements = ', '.join(f'{count} {kind}' for kind, count in result.statements.most_common()) or 'keine'
+        requests = ', '.join(f'{count}× {route}' for route, count in result.requests.most_common()) or 'keine'
+        summary = f'**{target.command.qualified_name}** hat {result.duration * 1000:.1f} ms gedauert.\n' \
+                  f'SQL: {statements}\nDiscord: {requests}\n' \
+                  f'Die Funktionen enthalten alles, was in der Zeit auf dem Event-Loop lief, nicht nur diesen Befehl.\n'
+        table = result.table(TOP_FUNCTIONS)
+        # Messages are limited to 2000 characters, the complete profile is in the file anyway.
+        table = table[:2000 - len(summary) - 10].rsplit('\n', 1)[0] if len(summary) + len(table) > 1990 else table
+        filename = re.sub(r'\W+', '-', target.command.qualified_name) + '.prof'
+        await ctx.send(f'{summary}```\n{table}\n```', file=discord.File(io.BytesIO(result.dump()), filename=filename))
+
+
+def setup(bot: discord.Bot):
+    for cog in [Debug]:
+        logger.info(f'Registering {cog.__name__} ...')
+        bot.add_cog(cog(bot))
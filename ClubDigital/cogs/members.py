@@ -0,0 +1,130 @@
+import os
+
+import discord
+from discord.ext import commands
+from loguru import logger
+
+from ClubDigital import database, members, cache
+from ClubDigital.writebehind import WriteBehindQueue
+
+# Joins are written in batches, at the latest after FLUSH_INTERVAL milliseconds or once FLUSH_ROWS members are pending.
+FLUSH_INTERVAL = int(os.environ.get('MEMBER_FLUSH_INTERVAL', 500))
+FLUSH_ROWS = int(os.environ.get('MEMBER_FLUSH_ROWS', 500))
+
+
+class Members(commands.Cog):
+    """
+    Hält die Benutzerdatenbank mit den Mitgliedern des Servers synchron.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self.joins = WriteBehindQueue('member_joins', self._enlist, interval=FLUSH_INTERVAL / 1000,
+                                      max_rows=FLUSH_ROWS)
+        logger.info('Cog: "Members" has been initialized.')
+
+    def cog_unload(self):
+        self.bot.loop.create_task(self.joins.close())
+
+    def export_state(self) -> dict:
+        # The joins that are still pending are written by the queue of the new instance.
+        return {'joins': self.joins.drain()}
+
+    def import_state(self, state: dict):
+        for dc_id, name in state['joins'].items():
+            self.joins.put(dc_id, name)
+
+    async def _enlist(self, joined: dict[int, str]):
+        await database.run_session(database.engine, members.enlist_members, joined)
+        for dc_id in joined:
+            cache.users.invalidate(dc_id)
+
+    async def _written(self, dc_id: int):
+        """Waits until a pending join of the member reached the database."""
+        if dc_id in self.joins:
+            await self.joins.flush()
+
+    async def _rename(self, dc_id: int, name: str):
+        if dc_id in self.joins:
+            # The join is not written yet, the new name simply replaces the pending one.
+            self.joins.put(dc_id, name)
+            return
+        await database.run_session(database.engine, members.rename_member, dc_id, name)
+        cache.users.invalidate(dc_id)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        if member.bot:
+            return
+        self.joins.put(member.id, member.name)
+
+    async def _member_elsewhere(self, dc_id: int, left: int) -> bool:
+        """Whether the user is still a member of another guild of the bot than `left`."""
+        for guild in self.bot.guilds:
+            if guild.id == left:
+                continue
+            if guild.chunked:
+                if guild.get_member(dc_id) is not None:
+                    return True
+                continue
+            try:
+                await guild.fetch_member(dc_id)
+                return True
+            except discord.NotFound:
+                pass
+        return False
+
+    async def _remove(self, guild_id: int, dc_id: int, name: str):
+        logger.info(f'{name}#{dc_id} left the guild {guild_id}.')
+        if await self._member_elsewhere(dc_id, guild_id):
+            # Like on reconnect, a user that only left one of the guilds keeps the project.
+            return
+        await self._written(dc_id)
+        await database.run_session(database.engine, members.remove_member, dc_id)
+        cache.users.invalidate(dc_id)
+        cache.projects.clear()
+        cache.project_names.clear()
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        await self._remove(member.guild.id, member.id, member.name)
+
+    @commands.Cog.listener()
+    async def on_uncached_member_remove(self, guild: discord.Guild, data: dict):
+        """`member_remove` is only sent for cached members, see `ProjektBotBase._parse_uncached_member_remove`."""
+        user = data['user']
+        await self._remove(guild.id, int(user['id']), user['username'])
+
+    async def _update_roles(self, dc_id: int, role_ids: list[int]):
+        await self._written(dc_id)
+        await database.run_session(database.engine, members.update_member_roles, dc_id, role_ids)
+        cache.users.invalidate(dc_id)
+        # The member might have become or stopped being the leader of a project.
+        cache.projects.clear()
+        cache.project_names.clear()
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.name != after.name:
+            await self._rename(after.id, after.name)
+        if before.roles != after.roles:
+            await self._update_roles(after.id, [role.id for role in after.roles])
+
+    @commands.Cog.listener()
+    async def on_uncached_member_update(self, guild: discord.Guild, data: dict):
+        """Without the member cache it is unknown what changed, so the name and the roles are applied as they are."""
+        user = data['user']
+        if user.get('bot'):
+            return
+        await self._rename(int(user['id']), user['username'])
+        await self._update_roles(int(user['id']), [int(role) for role in data['roles']])
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        if before.name != after.name:
+            await self._rename(after.id, after.name)
+
+
+def setup(bot: discord.Bot):
+    for cog in [Members]:
+        logger.info(f'Registering {cog.__name__} ...')
+        bot.add_cog(cog(bot))
@@ -1,44 +1,55 @@
-import logging
-import sys
+import asyncio
+import contextlib
+import types
 import typing
 
 import discord
 from discord.ext import commands
 from loguru import logger
 from prometheus_client import Gauge, Counter
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
-from ClubDigital import models
+from ClubDigital import models, database, cache, search
 from ClubDigital.bot import MyContext
-from ClubDigital.metrics import PROCESS_TIME
 
 PREFIX = "bot_project_cog_"
-DATABASE_CONNECTED = Gauge(PREFIX + 'database_connected', "State of database connection for the project cog")
-IN_PROGRESS = Gauge(PREFIX + "concurrent_commands", "Number of commands in Progress for PProject cog")
+IN_PROGRESS = Gauge(PREFIX + "concurrent_commands", "Number of commands in Progress for PProject cog",
+                    multiprocess_mode='livesum')
 PROJECTS_ADDED = Counter(PREFIX + "projects_added", "Number of projects that have been added")
 PROJECTS_REMOVED = Counter(PREFIX + 'projects_removed', 'Number of projects removed')
-PROJECTS_CURRENT = Gauge(PREFIX + 'current_project_count', "Number of Projects, that are active")
+PROJECTS_CURRENT = Gauge(PREFIX + 'current_project_count', "Number of Projects, that are active",
+                         multiprocess_mode='livemax')
 
+UNKNOWN_PROJECT = "Dieses Projekt existiert nicht!\nBitte stelle sicher, dass du dich nicht vertippt hast."
 
-class InterceptHandler(logging.Handler):
-    def emit(self, record):
-        # Get corresponding Loguru level if it exists.
-        try:
-            level = logger.level(record.levelname).name
-        except ValueError:
-            level = record.levelno
 
-        # Find caller from where originated the logged message.
-        frame, depth = sys._getframe(6), 6
-        while frame and frame.f_code.co_filename == logging.__file__:
-            frame = frame.f_back
-            depth += 1
+class SlashContext:
+    """
+    Lets the handlers of the prefix commands answer a slash command.
+
+    The handlers only use `send`, `typing`, `guild`, the author and `prj`, their messages become the responses of
+    the interaction.
+    """
+    def __init__(self, ctx: discord.ApplicationContext, prj: cache.ProjectRecord | None = None):
+        self.interaction = ctx
+        self.guild = ctx.guild
+        self.author = ctx.author
+        self.message = types.SimpleNamespace(author=ctx.author)
+        self.prj = prj
+
+    async def send(self, content: str | None = None, **kwargs):
+        return await self.interaction.respond(content, **kwargs)
+
+    def typing(self):
+        return contextlib.nullcontext()
 
-        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
 
+async def complete_projects(ctx: discord.AutocompleteContext) -> list[str]:
+    return ctx.command.cog.index.projects.complete(ctx.value or '')
 
-logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
+
+async def complete_repos(ctx: discord.AutocompleteContext) -> list[str]:
+    return ctx.command.cog.index.complete_repo(ctx.options.get('project') or '', ctx.value or '')
 
 
 class Project(commands.Cog):
@@ -47,96 +58,146 @@ class Project(commands.Cog):
     """
     def __init__(self, bot):
         self.bot = bot
-        self.engine = create_engine('sqlite:///../db.sqlite3')
-        self.session = Session(self.engine)
-        DATABASE_CONNECTED.set(1)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # At startup the event loop does not run yet, so loading the index blocks nothing.
+            with database.session_scope(database.engine) as session:
+                self._set_index(*self._load_index(session))
+        else:
+            # On a reload the index of the old instance is used until the new one is loaded, see `import_state`.
+            # The new one also knows the projects of other writers.
+            self.index = search.ProjectIndex()
+            loop.create_task(self._reload_index())
         logger.info('Cog: "Project" has been initialized.')
-        PROJECTS_CURRENT.set(self.session.query(models.Project).count())
-
-    @commands.Cog.listener()
-    async def on_member_joined(self, member):
-        instance = self.session.query(models.User).filter_by(username=member.name).first()
-        if not instance:
-            logger.info(f'Enlisted {member.name}#{member.id} into user database.')
-            self.session.add(models.User(member.name, member.id))
-        self.session.commit()
-
-    @commands.Cog.listener()
-    async def on_disconnect(self):
-        if self.session.is_active:
-            self.session.close()
-            logger.info("Closing the database connection for Project cog.")
-            DATABASE_CONNECTED.set(0)
-
-    @commands.Cog.listener()
-    async def on_connect(self):
-        logger.debug("Project cog connect listener.")
-        if not self.session.is_active:
-            self.session = Session(self.engine)
-            logger.info("Opening a new database connection for Project cog.")
-            DATABASE_CONNECTED.set(1)
-
-    @commands.Cog.listener()
-    async def on_resumed(self):
-        logger.debug("Project cog resumed listener.")
-        if not self.session.is_active:
-            self.session = Session(self.engine)
-            logger.info("Opening a new database connection for Project cog.")
-            DATABASE_CONNECTED.set(1)
+
+    def export_state(self) -> dict:
+        return {'index': self.index}
+
+    def import_state(self, state: dict):
+        self.index = state['index']
+
+    @staticmethod
+    def _load_index(session: Session) -> tuple[int, search.ProjectIndex]:
+        return session.query(models.Project).count(), search.ProjectIndex.load(session)
+
+    def _set_index(self, count: int, index: search.ProjectIndex):
+        PROJECTS_CURRENT.set(count)
+        self.index = index
+
+    async def _reload_index(self):
+        self._set_index(*await database.read_session(self._load_index))
+
+    @staticmethod
+    def _get_user(session: Session, dc_id: int) -> cache.UserRecord | None:
+        return cache.UserRecord.of(session.query(models.User).filter_by(dc_id=dc_id).first())
+
+    @staticmethod
+    def _get_project(session: Session, **criteria) -> cache.ProjectRecord | None:
+        return cache.ProjectRecord.of(session.query(models.Project).filter_by(**criteria).first())
+
+    async def get_user(self, dc_id: int) -> cache.UserRecord | None:
+        user = cache.users.get(dc_id)
+        if user is cache.MISSING:
+            user = await database.read_session(self._get_user, dc_id)
+            cache.users.put(dc_id, user)
+        return user
+
+    @staticmethod
+    def _repo_labels(session: Session, project_id: int) -> typing.List[str]:
+        return [label for label, in session.query(models.Repo.label).filter_by(project=project_id)]
+
+    async def get_project(self, project_id: int | None = None, name: str | None = None) -> cache.ProjectRecord | None:
+        project = cache.projects.get(project_id) if project_id is not None else cache.project_names.get(name)
+        if project is cache.MISSING:
+            if project_id is not None:
+                project = await database.read_session(self._get_project, id=project_id)
+            else:
+                project = await database.read_session(self._get_project, name=name)
+            if project:
+                cache.put_project(project)
+                if project.name not in self.index.projects:
+                    # The project was created outside of this cog, e.g. by the CLI or another worker.
+                    self.index.add_project(project.name)
+                    for label in await database.read_session(self._repo_labels, project.id):
+                        self.index.add_repo(project.name, label)
+        return project
+
+    async def get_project_of(self, dc_id: int) -> cache.ProjectRecord | None:
+        user = await self.get_user(dc_id)
+        if user and user.project_id:
+            return await self.get_project(user.project_id)
+        return None
+
+    def unknown_project(self, name: str, message: str = UNKNOWN_PROJECT) -> str:
+        """Appends the most similar project names to `message`."""
+        suggestions = self.index.projects.suggest(name)
+        if suggestions:
+            message += f'\nMeintest du {" oder ".join(f"`{suggestion}`" for suggestion in suggestions)}?'
+        return message
 
     @commands.group(aliases=["projekt"])
     async def project(self, ctx: MyContext):
         """Verwaltet die Projekte der AG."""
-        project = None
-        # if prj:
-        #     project = self.session.query(models.Project).filter_by(name=prj).first()
-        #     logger.debug(f'Querying for {prj} ...')
-        #
-        if not project:
-            user = self.session.query(models.User).filter_by(dc_id=ctx.message.author.id).first()
-            if user and user.project_id:
-                project = self.session.query(models.Project).filter_by(id=user.project_id).first()
-        await ctx.project(project)
+        await ctx.project(await self.get_project_of(ctx.message.author.id))
+
+    @staticmethod
+    def _list_embeds(session: Session) -> typing.List[discord.Embed]:
+        embeds = []
+        projects = session.query(models.Project).options(joinedload(models.Project.repository),
+                                                         joinedload(models.Project.users),
+                                                         joinedload(models.Project.leader_user))
+        for project in projects.order_by(models.Project.name).all():
+            embed = discord.Embed(title=project.name, description=project.description, color=int(project.color, 16))
+            if len(project.repository) > 0:
+                embed.add_field(name=f"Repository{'s' if len(project.repository) > 1 else ''}",
+                                value='\n'.join([f'{i.label}: http://{i.link}' for i in project.repository]))
+            if len(project.users) > 0:
+                embed.add_field(name=f'Mitglied{"er" if len(project.users) > 1 else ""}',
+                                value='\n'.join([i.username for i in project.users]))
+            if project.leader_user:
+                embed.add_field(name="Leiter", value=project.leader_user.username)
+            embeds.append(embed)
+        return embeds
 
     @project.command(name="ls", aliases=["list"])
     async def list(self, ctx):
         """Listet alle bekannten Projekte auf."""
         with IN_PROGRESS.track_inprogress():
-            with PROCESS_TIME.time():
-                with ctx.typing():
-                    data = self.session.query(models.Project).all()
-                    if len(data) <= 10:
-                        message = "Projektliste:"
-                        embeds = []
-                        for project in data:
-                            embed = discord.Embed(title=project.name, description=project.description, color=int(project.color, 16))
-                            if len(project.repository) > 0:
-                                embed.add_field(name=f"Repository{'s' if len(project.repository) > 1 else ''}",
-                                                value='\n'.join([f'{i.label}: http://{i.link}' for i in project.repository]))
-                            if len(project.users) > 0:
-                                embed.add_field(name=f'Mitglied{"er" if len(project.users) > 1 else ""}',
-                                                value='\n'.join([i.username for i in project.users]))
-                            if project.leader:
-                                leader: models.User = self.session.query(models.User).filter_by(id=project.leader)
-                                embed.add_field(name="Leiter", value=leader.username)
-                            embeds.append(embed)
-                        await ctx.send(message, embeds=embeds)
+            with ctx.typing():
+                embeds = await database.read_session(self._list_embeds)
+                # Discord only allows 10 embeds per message.
+                await ctx.send("Projektliste:", embeds=embeds[:10])
+                for start in range(10, len(embeds), 10):
+                    await ctx.send(embeds=embeds[start:start + 10])
+
+    @staticmethod
+    def _project_exists(session: Session, name: str) -> bool:
+        return session.query(models.Project).filter_by(name=name).first() is not None
+
+    @staticmethod
+    def _add_project(session: Session, name: str, description: str, role: int, lr: int) -> cache.ProjectRecord:
+        project = models.Project(name, description, role, lr)
+        session.add(project)
+        session.commit()
+        return cache.ProjectRecord.of(project)
 
     @project.command(name="add")
     async def add(self, ctx, name: str, description: str):
         """Legt ein neues Projekt an."""
         with IN_PROGRESS.track_inprogress():
-            with PROCESS_TIME.time():
-                with ctx.typing():
-                    instance = self.session.query(models.project.Project).filter_by(name=name).first()
-                    if not instance:
-                        role = await ctx.guild.create_role(name=name, hoist=True, mentionable=True,
-                                                    reason="Project was created, so the fitting role has to be created too.")
-                        lr = await ctx.guild.create_role(name=f'{name}-Lead', mentionable=True,
-                                                    reason="A project needs a leader, so it needs to be created.")
-
-                        self.session.add(models.project.Project(name, description, role.id, lr.id))
-                        self.session.commit()
+            with ctx.typing():
+                async with database.unit_of_work() as unit:
+                    if not await unit.run(self._project_exists, name):
+                        role, lr = await asyncio.gather(
+                            self.bot.rest.create_role(
+                                ctx.guild, name=name, hoist=True, mentionable=True,
+                                reason="Project was created, so the fitting role has to be created too."),
+                            self.bot.rest.create_role(ctx.guild, name=f'{name}-Lead', mentionable=True,
+                                                      reason="A project needs a leader, so it needs to be created."))
+
+                        cache.put_project(await unit.run(self._add_project, name, description, role.id, lr.id))
+                        self.index.add_project(name)
                         PROJECTS_ADDED.inc(1)
                         PROJECTS_CURRENT.inc(1)
                         await ctx.send(f'Added a project called "{name}".')
@@ -144,168 +205,323 @@ class Project(commands.Cog):
                         await ctx.send(f'This Project already exists!')
                     logger.info("Creating roles")
 
+    @staticmethod
+    def _project_roles(session: Session, name: str) -> tuple[int, int] | None:
+        instance = session.query(models.Project).filter_by(name=name).first()
+        if instance:
+            return instance.role, instance.leader_role
+        return None
+
+    @staticmethod
+    def _delete_project(session: Session, name: str):
+        instance = session.query(models.Project).filter_by(name=name).first()
+        if instance:
+            session.delete(instance)
+            session.commit()
+
     @project.command(name="rm", aliases=["remove"])
     async def delete(self, ctx, name: str):
         """Entfernt Projekte."""
         with IN_PROGRESS.track_inprogress():
-            with PROCESS_TIME.time():
-                with ctx.typing():
-                    instance = self.session.query(models.Project).filter_by(name=name).first()
-                    if instance:
-                        prj_role = ctx.guild.get_role(instance.role)
+            with ctx.typing():
+                async with database.unit_of_work() as unit:
+                    project_roles = await unit.run(self._project_roles, name)
+                    if project_roles:
+                        role, leader_role = project_roles
+                        deletions = []
+                        prj_role = ctx.guild.get_role(role)
                         if not prj_role:
-                            logger.info(f"Project role for {instance.name} was already absent.")
+                            logger.info(f"Project role for {name} was already absent.")
                         else:
-                            await prj_role.delete(reason="This is no longer needed.")
-                        prl_role = ctx.guild.get_role(instance.leader_role)
+                            deletions.append(self.bot.rest.delete_role(prj_role, reason="This is no longer needed."))
+                        prl_role = ctx.guild.get_role(leader_role)
                         if not prl_role:
-                            logger.info(f'Project-Leader role for {instance.name} was already absent.')
+                            logger.info(f'Project-Leader role for {name} was already absent.')
                         else:
-                            await prl_role.delete(reason="This is no longer needed.")
-                        self.session.delete(instance)
-                        self.session.commit()
+                            deletions.append(self.bot.rest.delete_role(prl_role, reason="This is no longer needed."))
+                        await asyncio.gather(*deletions)
+                        await unit.run(self._delete_project, name)
+                        cache.invalidate_project(name=name)
+                        self.index.remove_project(name)
                         PROJECTS_REMOVED.inc(1)
                         PROJECTS_CURRENT.dec(1)
-                        await ctx.send(f'Projekt "{instance.name}" wurde entfernt.')
+                        await ctx.send(f'Projekt "{name}" wurde entfernt.')
                     else:
-                        await ctx.send(f'Projekt existiert nicht.')
+                        await ctx.send(self.unknown_project(name, 'Projekt existiert nicht.'))
+
+    @staticmethod
+    def _users_by_dc_id(session: Session, dc_ids: typing.List[int]) -> typing.Dict[int, models.User]:
+        users = session.query(models.User).filter(models.User.dc_id.in_(dc_ids))
+        return {usr.dc_id: usr for usr in users}
+
+    @staticmethod
+    def _projects_by_id(session: Session, ids: typing.List[int | None]) -> typing.Dict[int, models.Project]:
+        projects = session.query(models.Project).filter(models.Project.id.in_({i for i in ids if i is not None}))
+        return {prj.id: prj for prj in projects}
+
+    def _join(self, session: Session, prj: str, members: typing.List[tuple[int, str]]):
+        """
+        Moves the given members into the project `prj`.
+
+        Returns the message for the channel, the id of the project role and for every moved member the ids of
+        the roles that have to be removed.
+        """
+        proj: models.Project = session.query(models.Project).filter_by(name=prj).first()
+        if not proj:
+            return f'Das Projekt {prj} existiert nicht!', None, {}
+        message = ""
+        moved = {}
+        users = self._users_by_dc_id(session, [dc_id for dc_id, _ in members])
+        old_projects = self._projects_by_id(session, [usr.project_id for usr in users.values()])
+        for dc_id, name in members:
+            usr = users.get(dc_id)
+            if not usr:
+                message += f'Der Benutzer {name} ist nicht in der Datenbank verzeichnet!\n'
+                continue
+            if usr.project_id == proj.id:
+                # Only the project role is given again, the roles of the project, e.g. the lead, must stay.
+                message += f'Benutzer {usr.username} ist bereits in {prj}.\n'
+                moved[dc_id] = ()
+            elif usr.project_id is None:
+                message += f'Benutzer {usr.username} zu {prj} hinzugefügt.\n'
+                moved[dc_id] = ()
+            else:
+                old = old_projects[usr.project_id]
+                message += f'Benutzer {usr.username} wurde von {old.name} zu {proj.name} verschoben.\n'
+                moved[dc_id] = (old.role, old.leader_role)
+            usr.project_id = proj.id
+        session.commit()
+        return message, proj.role, moved
 
     @project.command(name="join")
     async def join(self, ctx, prj: str, *users: typing.Optional[discord.Member]):
         """Fügt einen User einem Projekt hinzu."""
         with IN_PROGRESS.track_inprogress():
-            with PROCESS_TIME.time():
-                logger.debug(users)
-                message = ""
-                users = list(users)
-                if len(users) == 0:
-                    users.append(ctx.message.author)
+            logger.debug(users)
+            users = list(users)
+            if len(users) == 0:
+                users.append(ctx.message.author)
+            if not await self.get_project(name=prj):
+                await ctx.send(self.unknown_project(prj, f'Das Projekt {prj} existiert nicht!'))
+                return
 
-                with ctx.typing():
-                    for user in users:
-                        usr: models.User = self.session.query(models.User).filter_by(dc_id=user.id).first()
-                        proj: models.Project = self.session.query(models.Project).filter_by(name=prj).first()
-                        if not usr:
-                            message += f'Der Benutzer {user.name} ist nicht in der Datenbank verzeichnet!'
-                            return
-                        if not proj:
-                            message += f'Das Projekt {prj} existiert nicht!'
-                            return
-                        if usr.project_id is None:
-                            message += f'Benutzer {usr.username} zu {prj} hinzugefügt.\n'
-                        else:
-                            old = self.session.query(models.Project).filter_by(id=usr.project_id).first()
-                            message += f'Benutzer {usr.username} wurde von {old.name} zu {proj.name} verschoben.\n'
-                            if old.role in user.roles:
-                                await user.remove_roles(old.role)
-                            if old.leader_role in user.roles:
-                                await user.remove_roles(old.leader_role)
-                        usr.project_id = proj.id
-                        await user.add_roles(ctx.guild.get_role(proj.role))
-                    self.session.commit()
-                    await ctx.send(message)
+            with ctx.typing():
+                members = [(user.id, user.name) for user in users]
+                message, role, moved = await database.run_session(database.engine, self._join, prj, members)
+                for dc_id in moved:
+                    cache.users.invalidate(dc_id)
+                failed = await self.bot.rest.edit_roles(
+                    [(user, [role], moved[user.id]) for user in users if user.id in moved],
+                    reason=f"Joined the project {prj}.")
+                for user in failed:
+                    message += f'Die Rollen von {user.name} konnten nicht geändert werden.\n'
+                await ctx.send(message)
+
+    def _leave(self, session: Session, members: typing.List[int]):
+        """Removes the given members from their projects and returns the message and the roles to remove."""
+        message = ""
+        removed = {}
+        users = self._users_by_dc_id(session, members)
+        projects = self._projects_by_id(session, [usr.project_id for usr in users.values()])
+        for dc_id in members:
+            usr = users.get(dc_id)
+            if usr and usr.project_id is not None:
+                logger.debug(usr)
+                prj = projects[usr.project_id]
+                message += f'Benutzer {usr.username} wurde aus {prj.name} entfernt.\n'
+                usr.project_id = None
+                removed[dc_id] = (prj.role, prj.leader_role)
+        session.commit()
+        return message, removed
 
     @project.command(name="leave")
     async def leave(self, ctx, *users: typing.Optional[discord.Member]):
         """Entfernt Benutzer aus einem Projekt."""
         with IN_PROGRESS.track_inprogress():
-            with PROCESS_TIME.time():
-                with ctx.typing():
-                    message = ""
-                    users = list(users)
-                    if len(users) == 0:
-                        users.append(ctx.message.author)
-                    for user in users:
-                        usr = self.session.query(models.User).filter_by(dc_id=user.id).first()
-                        if usr:
-                            logger.debug(usr)
-                            prj = self.session.query(models.Project).filter_by(id=usr.project_id).first()
-                            message += f'Benutzer {usr.username} wurde aus {prj.name} entfernt.\n'
-                            usr.project_id = None
-                            if prj.role in user.roles:
-                                await user.remove_roles(prj.role)
-                            if prj.leader_role in user.roles:
-                                await user.remove_roles(prj.leader_role)
-                    self.session.commit()
-                    await ctx.send(message)
+            with ctx.typing():
+                users = list(users)
+                if len(users) == 0:
+                    users.append(ctx.message.author)
+                message, removed = await database.run_session(database.engine, self._leave, [user.id for user in users])
+                for dc_id in removed:
+                    cache.users.invalidate(dc_id)
+                failed = await self.bot.rest.edit_roles(
+                    [(user, [], removed[user.id]) for user in users if user.id in removed], reason="Left the project.")
+                for user in failed:
+                    message += f'Die Rollen von {user.name} konnten nicht geändert werden.\n'
+                await ctx.send(message)
+
+    @staticmethod
+    def _info(session: Session, prj: cache.ProjectRecord) -> str:
+        message = f'**Projektname:** {prj.name}\n\n'
+        repositories = session.query(models.Repo).filter_by(project=prj.id).all()
+        if len(repositories) > 0:
+            message += f"**Repository{'s' if len(repositories) > 1 else ''}:**\n"
+            for repo in repositories:
+                message += f'http://{repo.link}\n'
+            message += '\n'
+        message += f'**Projektbeschreibung:**\n{prj.description}\n\n**Mitglieder:**\n'
+        for user in session.query(models.User).filter_by(project_id=prj.id):
+            message += f'{user.username}\n'
+        return message
 
     @project.command(name="info")
     async def info(self, ctx: MyContext, proj: typing.Optional[str]):
         """Gibt Detailinformationen über ein spezielles Projekt."""
         with IN_PROGRESS.track_inprogress():
-            with PROCESS_TIME.time():
-                if not ctx.prj:
-                    prj: models.Project = self.session.query(models.Project).filter_by(name=proj).first()
-                else:
-                    prj: models.Project = ctx.prj
-                message = f'**Projektname:** {prj.name}\n\n'
-                if len(prj.repository) > 0:
-                    message += f"**Repository{'s' if len(prj.repository) > 1 else ''}:**\n"
-                    for repo in prj.repository:
-                        message += f'http://{repo.link}\n'
-                    message += '\n'
-                message += f'**Projektbeschreibung:**\n{prj.description}\n\n**Mitglieder:**\n'
-                for user in self.session.query(models.User).filter_by(project_id=prj.id):
-                    message += f'{user.username}\n'
-                await ctx.send(message)
+            prj = await self.get_project(name=proj) if proj else ctx.prj
+            if not prj:
+                await ctx.send(self.unknown_project(proj) if proj else UNKNOWN_PROJECT)
+                return
+            await ctx.send(await database.read_session(self._info, prj))
 
     @project.group()
     async def repo(self, ctx):
         pass
 
+    @staticmethod
+    def _repo_add(session: Session, project: str, label: str, link: str) -> str:
+        prj = session.query(models.Project).filter_by(name=project).first()
+        if not prj:
+            return UNKNOWN_PROJECT
+        repo = session.query(models.Repo).filter_by(label=label, project=prj.id).first()
+        if repo:
+            return ("Dieses Repo existiert bereits und kann nicht mehr hinzugefügt werden!\n"
+                    f"Bitte verwende `!project repo modify {project} {label} {link}`!")
+        session.add(models.Repo(prj.id, label, link))
+        session.commit()
+        return f"{label} wurde erfolgreich zum Projekt \"{project}\" hinzugefügt."
+
     @repo.command(name="add")
     async def repo_add(self, ctx, project: str, label: str, link: str):
         with IN_PROGRESS.track_inprogress():
-            with PROCESS_TIME.time():
-                prj = self.session.query(models.Project).filter_by(name=project).first()
-                if not prj:
-                    await ctx.send("Dieses Projekt existiert nicht!\n"
-                             "Bitte stelle sicher, dass du dich nicht vertippt hast.")
-                    return
-                repo = self.session.query(models.Repo).filter_by(label=label, project=prj.id).first()
-                if repo:
-                    await ctx.send("Dieses Repo existiert bereits und kann nicht mehr hinzugefügt werden!\n"
-                             f"Bitte verwende `!project repo modify {project} {label} {link}`!")
-                    return
-                self.session.add(models.Repo(prj.id, label, link))
-                self.session.commit()
-                await ctx.send(f"{label} wurde erfolgreich zum Projekt \"{project}\" hinzugefügt.")
+            if not await self.get_project(name=project):
+                await ctx.send(self.unknown_project(project))
+                return
+            message = await database.run_session(database.engine, self._repo_add, project, label, link)
+            cache.invalidate_project(name=project)
+            self.index.add_repo(project, label)
+            await ctx.send(message)
+
+    @staticmethod
+    def _repo_remove(session: Session, project: str, label: str) -> str:
+        prj = session.query(models.Project).filter_by(name=project).first()
+        if not prj:
+            return UNKNOWN_PROJECT
+        repo = session.query(models.Repo).filter_by(label=label, project=prj.id).first()
+        if not repo:
+            return (f"Das Repository {label} wurde nicht gefunden!\n"
+                    f"Bitte stelle sicher, dass du dich nicht vertippt hast.")
+        session.delete(repo)
+        session.commit()
+        return f'Das Repository {label} wurde entfernt.'
 
     @repo.command(name="rm")
     async def repo_remove(self, ctx, project: str, label: str):
         with IN_PROGRESS.track_inprogress():
-            with PROCESS_TIME.time():
-                prj = self.session.query(models.Project).filter_by(name=project).first()
-                if not prj:
-                    await ctx.send("Dieses Projekt existiert nicht!\n"
-                             "Bitte stelle sicher, dass du dich nicht vertippt hast.")
-                    return
-                repo = self.session.query(models.Repo).filter_by(label=label, project=prj.id).first()
-                if not repo:
-                    await ctx.send(f"Das Repository {label} wurde nicht gefunden!\n"
-                             f"Bitte stelle sicher, dass du dich nicht vertippt hast.")
-                    return
-                self.session.delete(repo)
-                self.session.commit()
-                await ctx.send(f'Das Repository {label} wurde entfernt.')
+            if not await self.get_project(name=project):
+                await ctx.send(self.unknown_project(project))
+                return
+            message = await database.run_session(database.engine, self._repo_remove, project, label)
+            cache.invalidate_project(name=project)
+            self.index.remove_repo(project, label)
+            await ctx.send(message)
+
+    @staticmethod
+    def _repo_modify(session: Session, project: str, label: str, link: str) -> str:
+        prj = session.query(models.Project).filter_by(name=project).first()
+        if not prj:
+            return UNKNOWN_PROJECT
+        repo = session.query(models.Repo).filter_by(label=label, project=prj.id).first()
+        if not repo:
+            return (f"Das Repository {label} wurde nicht gefunden!\n"
+                    f"Bitte stelle sicher, dass du dich nicht vertippt hast.")
+        repo.link = link
+        session.commit()
+        return f"Das Repository {label} wurde erfolgreich aktualisiert."
 
     @repo.command(name="modify")
     async def repo_modify(self, ctx, project: str, label: str, link: str):
         with IN_PROGRESS.track_inprogress():
-            with PROCESS_TIME.time():
-                prj = self.session.query(models.Project).filter_by(name=project).first()
-                if not prj:
-                    await ctx.send("Dieses Projekt existiert nicht!\n"
-                             "Bitte stelle sicher, dass du dich nicht vertippt hast.")
-                    return
-                repo = self.session.query(models.Repo).filter_by(label=label, project=prj.id).first()
-                if not repo:
-                    await ctx.send(f"Das Repository {label} wurde nicht gefunden!\n"
-                             f"Bitte stelle sicher, dass du dich nicht vertippt hast.")
-                    return
-                repo.link = link
-                self.session.commit()
-                await ctx.send(f"Das Repository {label} wurde erfolgreich aktualisiert.")
+            if not await self.get_project(name=project):
+                await ctx.send(self.unknown_project(project))
+                return
+            message = await database.run_session(database.engine, self._repo_modify, project, label, link)
+            cache.invalidate_project(name=project)
+            await ctx.send(message)
+
+    # The slash commands reuse the handlers of the prefix commands, see `SlashContext`. Creating roles can take
+    # longer than the three seconds Discord waits for an answer, so every command defers its response first.
+    slash_project = discord.SlashCommandGroup("project", "Verwaltet die Projekte der AG.")
+    slash_repo = slash_project.create_subgroup("repo", "Verwaltet die Repositories eines Projekts.")
+
+    @slash_project.command(name="ls")
+    async def slash_list(self, ctx: discord.ApplicationContext):
+        """Listet alle bekannten Projekte auf."""
+        await ctx.defer()
+        await self.list.callback(self, SlashContext(ctx))
+
+    @slash_project.command(name="add")
+    async def slash_add(self, ctx: discord.ApplicationContext, name: str, description: str):
+        """Legt ein neues Projekt an."""
+        await ctx.defer()
+        await self.add.callback(self, SlashContext(ctx), name, description)
+
+    @slash_project.command(name="rm")
+    async def slash_delete(self, ctx: discord.ApplicationContext,
+                           name: discord.Option(str, "Name des Projekts", autocomplete=complete_projects)):
+        """Entfernt Projekte."""
+        await ctx.defer()
+        await self.delete.callback(self, SlashContext(ctx), name)
+
+    @slash_project.command(name="join")
+    async def slash_join(self, ctx: discord.ApplicationContext,
+                         project: discord.Option(str, "Name des Projekts", autocomplete=complete_projects),
+                         member: discord.Option(discord.Member, "Standardmäßig du selbst", required=False)):
+        """Fügt einen User einem Projekt hinzu."""
+        await ctx.defer()
+        await self.join.callback(self, SlashContext(ctx), project, *([member] if member else []))
+
+    @slash_project.command(name="leave")
+    async def slash_leave(self, ctx: discord.ApplicationContext,
+                          member: discord.Option(discord.Member, "Standardmäßig du selbst", required=False)):
+        """Entfernt Benutzer aus einem Projekt."""
+        await ctx.defer()
+        await self.leave.callback(self, SlashContext(ctx), *([member] if member else []))
+
+    @slash_project.command(name="info")
+    async def slash_info(self, ctx: discord.ApplicationContext,
+                         project: discord.Option(str, "Standardmäßig dein Projekt", autocomplete=complete_projects,
+                                                 required=False)):
+        """Gibt Detailinformationen über ein spezielles Projekt."""
+        await ctx.defer()
+        prj = None if project else await self.get_project_of(ctx.author.id)
+        await self.info.callback(self, SlashContext(ctx, prj), project)
+
+    @slash_repo.command(name="add")
+    async def slash_repo_add(self, ctx: discord.ApplicationContext,
+                             project: discord.Option(str, "Name des Projekts", autocomplete=complete_projects),
+                             label: str, link: str):
+        """Fügt einem Projekt ein Repository hinzu."""
+        await ctx.defer()
+        await self.repo_add.callback(self, SlashContext(ctx), project, label, link)
+
+    @slash_repo.command(name="rm")
+    async def slash_repo_remove(self, ctx: discord.ApplicationContext,
+                                project: discord.Option(str, "Name des Projekts", autocomplete=complete_projects),
+                                label: discord.Option(str, "Bezeichnung des Repositorys", autocomplete=complete_repos)):
+        """Entfernt ein Repository aus einem Projekt."""
+        await ctx.defer()
+        await self.repo_remove.callback(self, SlashContext(ctx), project, label)
+
+    @slash_repo.command(name="modify")
+    async def slash_repo_modify(self, ctx: discord.ApplicationContext,
+                                project: discord.Option(str, "Name des Projekts", autocomplete=complete_projects),
+                                label: discord.Option(str, "Bezeichnung des Repositorys", autocomplete=complete_repos),
+                                link: str):
+        """Ändert den Link eines Repositorys."""
+        await ctx.defer()
+        await self.repo_modify.callback(self, SlashContext(ctx), project, label, link)
 
 
 def setup(bot: discord.Bot):
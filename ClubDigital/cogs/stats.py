@@ -1,87 +1,158 @@
+import asyncio
 import colorsys
-import datetime
-import pathlib
-from typing import List
+import io
+import math
+import os
+import re
 
 import discord
-import pandas
 from discord.ext import commands, tasks
 from prometheus_client import Gauge
 from loguru import logger
 
-from ClubDigital.metrics import PROCESS_TIME
+from ClubDigital import cache, charts, database, latency
+from ClubDigital.ringbuffer import RingBuffer
 
-LATENCY = Gauge('bot_latency_gauge', 'The latency reported by pycord')
+LATENCY = Gauge('bot_latency_gauge', 'The latency reported by pycord', multiprocess_mode='livemax')
+SHARD_LATENCY = Gauge('bot_shard_latency', 'The latency of every shard', ['shard'], multiprocess_mode='liveall')
+
+# Number of latency samples that are kept in memory, one sample is taken every second (default: 24 hours).
+PING_HISTORY = int(os.environ.get('PING_HISTORY', 24 * 60 * 60))
+
+# Number of windows whose chart is kept, every window a user asks for leaves one PNG behind.
+CHART_CACHE_SIZE = 8
+
+WINDOW_UNITS = {'m': latency.MINUTE, 'h': latency.HOUR, 'd': latency.DAY}
+
+
+def parse_window(window: str) -> int | None:
+    """Converts windows like `30m`, `1h` or `7d` to seconds."""
+    match = re.fullmatch(r'(\d+)([mhd])', window.strip().lower())
+    if not match or int(match[1]) == 0:
+        return None
+    return int(match[1]) * WINDOW_UNITS[match[2]]
 
 
 class Stats(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.ping_stats: List[dict] = []
-        self.ping_timeout = 0
+        self.ping_stats = RingBuffer(PING_HISTORY)
+        self._pending: list[tuple[int, float]] = []
+        # Maps the window in seconds to the key and the rendering of its chart.
+        self._charts = cache.LRUCache('charts', maxsize=CHART_CACHE_SIZE)
         logger.info('Cog "Stats" has been initialized.')
 
     @commands.Cog.listener()
     async def on_ready(self):
         logger.info("Started Ping collection")
-        if not self.collect_ping_metric.is_running():
-            self.collect_ping_metric.start()
+        for loop in (self.collect_ping_metric, self.persist_ping_metric, self.rollup_ping_metric):
+            if not loop.is_running():
+                loop.start()
+
+    def cog_unload(self):
+        for loop in (self.collect_ping_metric, self.persist_ping_metric, self.rollup_ping_metric):
+            loop.cancel()
+        asyncio.ensure_future(self.persist_ping_metric())
+        charts.shutdown()
+
+    def export_state(self) -> dict:
+        # The pending samples go to the new instance, so they are not written twice.
+        pending, self._pending = self._pending, []
+        return {'ping_stats': self.ping_stats, 'pending': pending}
+
+    def import_state(self, state: dict):
+        if state['ping_stats'].capacity == self.ping_stats.capacity:
+            self.ping_stats = state['ping_stats']
+        else:
+            for timestamp, value in zip(*state['ping_stats'].window()):
+                self.ping_stats.append(float(value), int(timestamp))
+        self._pending = state['pending'] + self._pending
+
+    def latency_chart(self, seconds: int, key: tuple, *data) -> asyncio.Future:
+        """
+        Returns the PNG of the latency history of a window.
+
+        The chart is only drawn again, when `key` changed, e.g. after a new sample has been added. Concurrent calls
+        share the same rendering, a cancelled or failed one is started again.
+        """
+        chart = self._charts.get(seconds)
+        if chart is cache.MISSING or chart[0] != key or chart[1].cancelled() \
+                or chart[1].done() and chart[1].exception() is not None:
+            chart = key, asyncio.ensure_future(charts.render(charts.render_latency_chart, *data))
+            self._charts.put(seconds, chart)
+        return chart[1]
 
-    # update interval: 42 seconds
     @tasks.loop(seconds=1)
     async def collect_ping_metric(self):
-        latency = round(self.bot.latency * 1000, 3)
-        if len(self.ping_stats) < 1:
-            self.ping_stats.append({'value': latency, 'timestamp': datetime.datetime.now()})
-            LATENCY.set(self.bot.latency)
-            ping_timeout = 0
-        elif self.ping_stats[-1]["value"] != latency:
-            self.ping_stats.append({'value': latency, 'timestamp': datetime.datetime.now()})
-            LATENCY.set(self.bot.latency)
-        else:
-            self.ping_timeout += 1
-        if self.ping_timeout == 42:
-            self.ping_stats.append({'value': latency, 'timestamp': datetime.datetime.now()})
-            LATENCY.set(self.bot.latency)
-            ping_timeout = 0
-        while len(self.ping_stats) > 100:
-            self.ping_stats.pop(0)
+        value = round(self.bot.latency * 1000, 3)
+        timestamp = latency.now_ms()
+        self.ping_stats.append(value, timestamp)
+        LATENCY.set(self.bot.latency)
+        for shard, shard_latency in getattr(self.bot, 'latencies', [(self.bot.shard_id or 0, self.bot.latency)]):
+            SHARD_LATENCY.labels(shard).set(shard_latency)
+        if math.isfinite(value):
+            self._pending.append((timestamp, value))
+
+    @tasks.loop(seconds=10)
+    async def persist_ping_metric(self):
+        """Writes the collected samples in one batch."""
+        pending, self._pending = self._pending, []
+        if pending:
+            await database.run_session(database.engine, latency.store_samples, pending)
+
+    @tasks.loop(minutes=1)
+    async def rollup_ping_metric(self):
+        await database.run_session(database.engine, latency.rollup)
 
     @commands.command()
-    async def ping(self, ctx):
-        """Zeigt die aktuelle Latenz des Bots zusammen mit ein paar verwandten Statistiken an."""
-        with PROCESS_TIME.time():
-            ping = round(ctx.bot.latency * 1000, 1)
-            ping_int = int(ping)
-            hue = max(0, 120 - (ping_int // 5))
-            color = int("".join([f'{hex(int(i * 255))[2:]:02}' for i in colorsys.hsv_to_rgb(hue / 360, 1, 1)]), 16)
-
-            ts = pandas.DataFrame(self.ping_stats)
-            ts.set_index('timestamp', inplace=True)
-
-            message = discord.Embed(title='Pong', color=color)
-            message.add_field(name="Latenz", value=f'{ping} ms')
-            message.add_field(name="Minimum", value=f'{round(ts.min()["value"], 1)} ms')
-            message.add_field(name="Mittelwert", value=f'{round(ts.median()["value"], 3)} ms')
-            message.add_field(name="Maximum", value=f'{round(ts.max()["value"], 1)} ms')
-
-            if len(self.ping_stats) > 1:
-                logger.debug(ts)
-                ts.cumsum()
-
-                plot = ts.plot(legend=False)
-
-                fig = plot.get_figure()
-                fig.savefig("ping.png", dpi=100, transparent=False)
-                fig.clf()
-
-                image = discord.File("ping.png", filename="ping.png")
-                message.set_image(url='attachment://ping.png')
-
-                await ctx.send(embed=message, file=image)
-                pathlib.Path("ping.png").unlink()
+    async def ping(self, ctx, window: str = '1h'):
+        """
+        Zeigt die aktuelle Latenz des Bots zusammen mit ein paar verwandten Statistiken an.
+
+        Der Zeitraum der Statistik kann z.B. mit `1h`, `1d` oder `7d` angegeben werden.
+        """
+        seconds = parse_window(window)
+        if not seconds:
+            await ctx.send(f'Den Zeitraum "{window}" kenne ich nicht. Versuche es z.B. mit `1h`, `1d` oder `7d`.')
+            return
+        ping = round(ctx.bot.latency * 1000, 1)
+        ping_int = int(ping)
+        hue = max(0, 120 - (ping_int // 5))
+        color = int("".join([f'{hex(int(i * 255))[2:]:02}' for i in colorsys.hsv_to_rgb(hue / 360, 1, 1)]), 16)
+
+        message = discord.Embed(title='Pong', color=color)
+        message.add_field(name="Latenz", value=f'{ping} ms')
+        timestamps, _ = self.ping_stats.window()
+        in_memory = latency.resolution_for(seconds) is None and len(timestamps) > 0 \
+            and timestamps[-1] - timestamps[0] >= seconds * 1000
+        if in_memory:
+            # Short windows are answered from the samples in memory, as long as they reach back far enough.
+            stats = self.ping_stats.stats(seconds)
+            key = ('memory', self.ping_stats.version)
+            data = self.ping_stats.window(seconds)
+        else:
+            series = await database.read_session(latency.query, seconds)
+            stats = series.stats()
+            key = ('database', series.resolution, int(series.timestamps[-1]) if len(series) else 0)
+            if series.resolution is None:
+                data = series.timestamps, series.average
             else:
-                await ctx.send(f'{ping} ms', embed=message)
+                data = series.timestamps, series.average, series.minimum, series.maximum
+
+        if stats:
+            minimum, median, maximum = stats
+            message.add_field(name="Minimum", value=f'{round(minimum, 1)} ms')
+            message.add_field(name="Mittelwert", value=f'{round(median, 3)} ms')
+            message.add_field(name="Maximum", value=f'{round(maximum, 1)} ms')
+
+        if len(data[0]) > 1:
+            chart = await asyncio.shield(self.latency_chart(seconds, key, *data))
+            image = discord.File(io.BytesIO(chart), filename="ping.png")
+            message.set_image(url='attachment://ping.png')
+
+            await ctx.send(embed=message, file=image)
+        else:
+            await ctx.send(f'{ping} ms', embed=message)
 
     # @commands.command()
     # async def count(self, ctx):
@@ -0,0 +1,191 @@
+import asyncio
+import contextlib
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, TypeVar
+
+import sqlalchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+from ClubDigital import profiling
+from ClubDigital.metrics import QUERY_COUNT, QUERY_TIME, SESSIONS_OPEN, SESSION_LIFETIME, SESSION_IDENTITY_MAP
+
+T = TypeVar('T')
+
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///../db.sqlite3')
+READERS = int(os.environ.get('DATABASE_READERS', 2))
+BUSY_TIMEOUT = 5_000  # milliseconds
+CACHE_SIZE = 64 * 1024  # KiB per connection
+MMAP_SIZE = 256 * 1024 * 1024  # bytes
+
+# SQLite only allows a single writer at a time, so every write of the bot is funneled through
+# one dedicated thread. This keeps the event loop free while a query is running and makes sure
+# that the session of a unit of work is never used by two threads at once.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='database')
+# In WAL mode readers do not block the writer and vice versa, so reads get their own threads.
+_read_executor = ThreadPoolExecutor(max_workers=READERS, thread_name_prefix='database-read')
+
+
+async def run(func: Callable[..., T], *args, **kwargs) -> T:
+    """Runs a blocking database function on the database thread and waits for the result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, profiling.bind(functools.partial(func, *args, **kwargs)))
+
+
+class UnitOfWork:
+    """
+    A short-lived session for one command or event.
+
+    The session is opened with `async with` and closed at the end of the block, changes that were not committed by
+    then are rolled back. `run` calls a function with the session on the database thread. Because the session expires
+    its rows on commit and is thrown away afterwards, nothing that it loaded outlives the command, so the memory of the
+    bot does not grow with the number of rows it has seen and the next command sees the changes of other writers.
+    """
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.session: Session | None = None
+        self._label = 'reader' if engine is reader else 'writer'
+        self._opened = 0.0
+
+    def open(self) -> Session:
+        self.session = Session(self.engine, expire_on_commit=True)
+        self._opened = time.perf_counter()
+        SESSIONS_OPEN.labels(self._label).inc()
+        return self.session
+
+    def close(self):
+        SESSION_IDENTITY_MAP.labels(self._label).observe(self.session.info.get('identity_map_peak', 0))
+        self.session.close()
+        SESSION_LIFETIME.labels(self._label).observe(time.perf_counter() - self._opened)
+        SESSIONS_OPEN.labels(self._label).dec()
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Runs `func` on the database thread and passes the session as first argument."""
+        return await run(func, self.session, *args, **kwargs)
+
+    async def __aenter__(self) -> 'UnitOfWork':
+        # Opening does not touch the database yet, the connection is checked out by the first query.
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await run(self.close)
+
+
+@event.listens_for(Session, 'loaded_as_persistent')
+def _loaded_as_persistent(session: Session, instance):
+    # The identity map only holds weak references, at the end of the session it is mostly empty already.
+    session.info['identity_map_peak'] = max(session.info.get('identity_map_peak', 0), len(session.identity_map))
+
+
+def unit_of_work() -> UnitOfWork:
+    """A unit of work on the `engine` that writes, see `UnitOfWork`."""
+    return UnitOfWork(engine)
+
+
+@contextlib.contextmanager
+def session_scope(engine: Engine) -> Iterator[Session]:
+    """The blocking variant of `UnitOfWork` for code that already runs on a database thread."""
+    unit = UnitOfWork(engine)
+    try:
+        yield unit.open()
+    finally:
+        unit.close()
+
+
+async def run_session(engine: Engine, func: Callable[..., T], *args, **kwargs) -> T:
+    """Opens a new session on the database thread and passes it as first argument to `func`."""
+    def wrapper():
+        with session_scope(engine) as session:
+            return func(session, *args, **kwargs)
+    return await run(wrapper)
+
+
+async def read_session(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Like `run_session`, but on one of the reader threads with a connection of the `reader` pool.
+
+    The connections of the pool are read only, so `func` must not write to the database.
+    """
+    def wrapper():
+        with session_scope(reader) as session:
+            return func(session, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_read_executor, profiling.bind(wrapper))
+
+
+def _statement_type(statement: str) -> str:
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'UNKNOWN'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start'].pop()
+    statement_type = _statement_type(statement)
+    QUERY_COUNT.labels(statement_type).inc()
+    QUERY_TIME.labels(statement_type).observe(duration)
+    profiling.count_statement(statement_type)
+
+
+def instrument(engine: Engine) -> Engine:
+    """Records the number and the duration of the statements of `engine`, grouped by statement type."""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    return engine
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+    cursor.execute(f'PRAGMA cache_size=-{CACHE_SIZE}')
+    cursor.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT}')
+    cursor.close()
+
+
+def _configure_sqlite_reader(dbapi_connection, connection_record):
+    _configure_sqlite(dbapi_connection, connection_record)
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA query_only=ON')
+    cursor.close()
+
+
+def create_engine(url: str = DATABASE_URL, readonly: bool = False, pool_size: int = 1) -> Engine:
+    """
+    Creates an instrumented engine for `url`.
+
+    SQLite databases are switched to WAL mode and tuned with the pragmas above on every new connection. The
+    connections are kept open in a pool, so the page cache and the memory map survive between the sessions.
+    """
+    # A unit of work can hold a connection while it waits for Discord and another session writes, so the
+    # pool of the writer may grow. Every reader thread only ever uses one connection.
+    max_overflow = 0 if readonly else -1
+    if not url.startswith('sqlite'):
+        return instrument(sqlalchemy.create_engine(url, pool_size=pool_size, max_overflow=max_overflow))
+    engine = sqlalchemy.create_engine(url, poolclass=QueuePool, pool_size=pool_size, max_overflow=max_overflow,
+                                      connect_args={'check_same_thread': False})
+    event.listen(engine, 'connect', _configure_sqlite_reader if readonly else _configure_sqlite)
+    return instrument(engine)
+
+
+# The engine for everything that writes, it is only used on the database thread.
+engine = create_engine()
+# The engine for `read_session`, one connection per reader thread.
+reader = create_engine(readonly=True, pool_size=READERS)
+
+
+def shutdown():
+    _executor.shutdown(wait=True)
+    _read_executor.shutdown(wait=True)
+    engine.dispose()
+    reader.dispose()
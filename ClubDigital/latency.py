@@ -0,0 +1,116 @@
+import time
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy
+from sqlalchemy import func, insert, select, delete
+from sqlalchemy.orm import Session
+
+from ClubDigital.models import LatencySample, LatencyRollup
+
+MINUTE = 60
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# How long the samples of each level are kept, in seconds. `None` is the level of the raw samples.
+RETENTION = {None: 2 * DAY, MINUTE: 30 * DAY, HOUR: 365 * DAY}
+
+
+@dataclass
+class LatencySeries:
+    """Latency values of a time window. For raw samples minimum, average and maximum are the same array."""
+    resolution: int | None
+    timestamps: numpy.ndarray
+    minimum: numpy.ndarray
+    average: numpy.ndarray
+    maximum: numpy.ndarray
+    count: numpy.ndarray
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def stats(self) -> tuple[float, float, float] | None:
+        if len(self) == 0:
+            return None
+        return float(self.minimum.min()), float(numpy.average(self.average, weights=self.count)), \
+            float(self.maximum.max())
+
+
+def now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def resolution_for(seconds: int) -> int | None:
+    """Picks the level that answers a window of `seconds` with at most a few thousand points."""
+    if seconds <= 2 * HOUR:
+        return None
+    if seconds <= 2 * DAY:
+        return MINUTE
+    return HOUR
+
+
+def store_samples(session: Session, samples: Iterable[tuple[int, float]]):
+    """Writes a batch of `(timestamp, value)` samples with a single statement."""
+    rows = [{'timestamp': timestamp, 'value': value} for timestamp, value in samples]
+    if rows:
+        session.execute(insert(LatencySample).prefix_with('OR REPLACE'), rows)
+        session.commit()
+
+
+def _rollup(session: Session, resolution: int, source, minimum, average, maximum, count, now: int):
+    size = resolution * 1000
+    start = session.query(func.max(LatencyRollup.bucket)).filter_by(resolution=resolution).scalar()
+    if start is None:
+        start = session.query(func.min(source.c.timestamp)).scalar()
+        if start is None:
+            return
+    start -= start % size
+    end = now - now % size
+    if end <= start:
+        return
+    bucket = (source.c.timestamp / size) * size
+    rows = select(resolution, bucket, minimum, average, maximum, count) \
+        .where(source.c.timestamp >= start, source.c.timestamp < end) \
+        .group_by(bucket)
+    session.execute(insert(LatencyRollup).prefix_with('OR REPLACE').from_select(
+        ['resolution', 'bucket', 'minimum', 'average', 'maximum', 'count'], rows))
+
+
+def rollup(session: Session, now: int | None = None):
+    """
+    Downsamples the completed minutes and hours and removes samples that are older than their retention.
+
+    The last bucket of every level is computed again, so it is safe to call this at any interval.
+    """
+    now = now or now_ms()
+    samples = select(LatencySample.timestamp, LatencySample.value).subquery()
+    _rollup(session, MINUTE, samples, func.min(samples.c.value), func.avg(samples.c.value),
+            func.max(samples.c.value), func.count(), now)
+    minutes = select(LatencyRollup.bucket.label('timestamp'), LatencyRollup.minimum, LatencyRollup.average,
+                     LatencyRollup.maximum, LatencyRollup.count).where(LatencyRollup.resolution == MINUTE).subquery()
+    _rollup(session, HOUR, minutes, func.min(minutes.c.minimum),
+            func.sum(minutes.c.average * minutes.c['count']) / func.sum(minutes.c['count']),
+            func.max(minutes.c.maximum), func.sum(minutes.c['count']), now)
+
+    session.execute(delete(LatencySample).where(LatencySample.timestamp < now - RETENTION[None] * 1000))
+    for resolution in (MINUTE, HOUR):
+        session.execute(delete(LatencyRollup).where(LatencyRollup.resolution == resolution,
+                                                    LatencyRollup.bucket < now - RETENTION[resolution] * 1000))
+    session.commit()
+
+
+def query(session: Session, seconds: int, now: int | None = None) -> LatencySeries:
+    """Returns the latency of the last `seconds` from the level that fits the window."""
+    start = (now or now_ms()) - seconds * 1000
+    resolution = resolution_for(seconds)
+    if resolution is None:
+        rows = session.query(LatencySample.timestamp, LatencySample.value, LatencySample.value, LatencySample.value,
+                             1).filter(LatencySample.timestamp >= start).order_by(LatencySample.timestamp).all()
+    else:
+        rows = session.query(LatencyRollup.bucket, LatencyRollup.minimum, LatencyRollup.average,
+                             LatencyRollup.maximum, LatencyRollup.count) \
+            .filter(LatencyRollup.resolution == resolution, LatencyRollup.bucket >= start) \
+            .order_by(LatencyRollup.bucket).all()
+    columns = numpy.array(rows, dtype=numpy.float64).reshape(-1, 5).T
+    return LatencySeries(resolution, columns[0].astype(numpy.int64), columns[1].astype(numpy.float32),
+                         columns[2].astype(numpy.float32), columns[3].astype(numpy.float32), columns[4])
@@ -0,0 +1,122 @@
+"""
+The logging setup of the bot.
+
+Records of the standard library loggers (pycord, SQLAlchemy, aiohttp) are forwarded to loguru, and loguru writes
+through a queue, so a slow terminal or log collector never blocks the event loop. The configuration comes from the
+environment:
+
+    LOG_LEVEL   level of the loguru sink, default INFO
+    LOG_LEVELS  levels of single standard library loggers, e.g. "discord=INFO,discord.gateway=WARNING"
+    LOG_SAMPLE  share of the DEBUG records of noisy loggers that is kept, e.g. "discord.gateway=0.01"
+    LOG_QUEUE   number of messages that may wait for the writer thread, default 10000
+"""
+import logging
+import os
+import queue
+import sys
+import threading
+from typing import TextIO
+
+from loguru import logger
+
+from ClubDigital.metrics import LOG_RECORDS, LOG_DROPPED
+
+DEFAULT_LEVELS = {'discord': 'INFO', 'sqlalchemy': 'WARNING', 'aiohttp': 'WARNING'}
+DEFAULT_SAMPLE = {'discord.gateway': 0.01, 'discord.http': 0.1, 'discord.state': 0.1}
+
+
+def parse(spec: str, convert=str) -> dict:
+    """Parses a list like `discord=INFO,sqlalchemy=WARNING` into a dict."""
+    items = (item.split('=', 1) for item in spec.split(',') if '=' in item)
+    return {name.strip(): convert(value.strip()) for name, value in items}
+
+
+class QueueSink:
+    """
+    A loguru sink that hands the formatted messages to a writer thread.
+
+    If the writer falls behind by more than `maxsize` messages, new messages are dropped instead of blocking the
+    caller.
+    """
+    def __init__(self, stream: TextIO, maxsize: int = 10_000):
+        self.stream = stream
+        self.queue: queue.Queue[str | None] = queue.Queue(maxsize)
+        self.thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self.thread.start()
+
+    def write(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            LOG_DROPPED.labels('queue').inc()
+
+    def _run(self):
+        while (message := self.queue.get()) is not None:
+            self.stream.write(message)
+            if self.queue.empty():
+                self.stream.flush()
+
+    def stop(self):
+        """Writes the remaining messages and stops the writer thread, loguru calls this when the sink is removed."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+
+class InterceptHandler(logging.Handler):
+    """
+    Forwards the records of the standard library loggers to loguru.
+
+    DEBUG records of the loggers in `sample` are thinned out, only every n-th record is kept.
+    """
+    def __init__(self, sample: dict[str, float] | None = None):
+        super().__init__()
+        self.every = {name: max(1, round(1 / rate)) if rate > 0 else 0 for name, rate in (sample or {}).items()}
+        self.seen: dict[str, int] = {}
+
+    def _sampled_out(self, record: logging.LogRecord) -> bool:
+        name = record.name
+        while name not in self.every:
+            if '.' not in name:
+                return False
+            name = name.rsplit('.', 1)[0]
+        self.seen[name] = self.seen.get(name, 0) + 1
+        return self.every[name] == 0 or self.seen[name] % self.every[name] != 0
+
+    def emit(self, record: logging.LogRecord):
+        if record.levelno <= logging.DEBUG and self.every and self._sampled_out(record):
+            LOG_DROPPED.labels('sampled').inc()
+            return
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        # The location is taken from the record, this is much cheaper than searching the caller on the stack.
+        logger.patch(lambda r: r.update(name=record.name, function=record.funcName, line=record.lineno)) \
+            .opt(exception=record.exc_info).log(level, record.getMessage())
+
+
+def _count(record) -> bool:
+    LOG_RECORDS.labels(record['level'].name).inc()
+    return True
+
+
+def setup(level: str | None = None, levels: dict[str, str] | None = None, sample: dict[str, float] | None = None,
+          enqueue: bool = True):
+    """Configures loguru and the standard library loggers, the arguments override the environment."""
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    levels = levels if levels is not None else DEFAULT_LEVELS | parse(os.environ.get('LOG_LEVELS', ''))
+    sample = sample if sample is not None else DEFAULT_SAMPLE | parse(os.environ.get('LOG_SAMPLE', ''), float)
+
+    logger.remove()
+    sink = QueueSink(sys.stderr, int(os.environ.get('LOG_QUEUE', 10_000))) if enqueue else sys.stderr
+    # `colorize` has to be given explicitly, loguru can not tell whether the queue ends in a terminal.
+    logger.add(sink, level=level, filter=_count, colorize=sys.stderr.isatty())
+
+    # Records below the level of their logger are discarded by the standard library, before they are formatted.
+    root_level = logging.getLevelName(level)
+    logging.basicConfig(handlers=[InterceptHandler(sample)], level=root_level if isinstance(root_level, int) else 0,
+                        force=True)
+    for name, logger_level in levels.items():
+        logging.getLogger(name).setLevel(logger_level)
+
@@ -0,0 +1,91 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+from discord.ext import commands
+from loguru import logger
+from prometheus_client import Histogram, Counter
+
+LOOP_LAG = Histogram('bot_event_loop_lag', 'Delay of the event loop when waking up a sleeping task.',
+                     buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+BLOCKING_CALLS = Counter('bot_event_loop_blocked', 'Number of times the event loop was blocked longer than the threshold.',
+                         ['cog', 'command'])
+
+
+def find_command(frame) -> tuple[str, str]:
+    """Walks up the stack of the blocked coroutine and looks for the context of the command that is running."""
+    while frame is not None:
+        ctx = frame.f_locals.get('ctx')
+        if isinstance(ctx, commands.Context) and ctx.command is not None:
+            cog = ctx.command.cog.qualified_name if ctx.command.cog else ''
+            return cog, ctx.command.qualified_name
+        frame = frame.f_back
+    return '', ''
+
+
+class Watchdog:
+    """
+    Measures the lag of the event loop and reports callbacks that block it.
+
+    A task on the event loop wakes up every `interval` seconds and records how late it was. A separate thread checks
+    that the task keeps running. If the loop did not react for `threshold` seconds, the thread captures the stack of
+    the loop and logs it. Reports of the same command are logged at most once every `log_interval` seconds.
+    """
+    def __init__(self, interval: float = 0.1, threshold: float = 0.5, log_interval: float = 60):
+        self.interval = interval
+        self.threshold = threshold
+        self.log_interval = log_interval
+        self._heartbeat = time.monotonic()
+        self._loop_thread: int | None = None
+        self._logged: dict[tuple[str, str], float] = {}
+        self._suppressed: dict[tuple[str, str], int] = {}
+        self._stopped = threading.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._task = loop.create_task(self._measure())
+        threading.Thread(target=self._monitor, name='watchdog', daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _measure(self):
+        self._loop_thread = threading.get_ident()
+        while True:
+            self._heartbeat = time.monotonic()
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            LOOP_LAG.observe(max(0.0, time.perf_counter() - start - self.interval))
+
+    def _monitor(self):
+        reported = None
+        while not self._stopped.wait(self.interval):
+            heartbeat = self._heartbeat
+            if self._loop_thread is None or time.monotonic() - heartbeat < self.threshold:
+                continue
+            if reported == heartbeat:
+                # This blocking call has already been reported.
+                continue
+            reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                self._report(frame, time.monotonic() - heartbeat)
+
+    def _report(self, frame, blocked: float):
+        key = find_command(frame)
+        BLOCKING_CALLS.labels(*key).inc()
+        now = time.monotonic()
+        if now - self._logged.get(key, 0) < self.log_interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return
+        self._logged[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        cog, command = key
+        logger.warning(f'The event loop is blocked for more than {blocked:.2f} s'
+                       f'{f" by command {command!r} of cog {cog!r}" if command else ""}'
+                       f'{f" ({suppressed} similar reports suppressed)" if suppressed else ""}:\n'
+                       + ''.join(traceback.format_stack(frame)))
@@ -1,4 +1,5 @@
-import logging
+from ClubDigital import startup
+
 import os
 import pathlib
 import sys
@@ -6,67 +7,74 @@ import sys
 import aiohttp.client_exceptions
 import discord
 import dotenvy
-import matplotlib.pyplot as plt
 import sqlalchemy
 from discord.ext import commands
 from dotenvy import load_env, read_file
 from loguru import logger
 from prometheus_client import start_http_server, Gauge, Counter
 
-from bot import ProjektBot, ONLINE_STATE
+from bot import ProjektBot, ShardedProjektBot, ONLINE_STATE
+from ClubDigital import cluster, logconfig
+from ClubDigital.loopwatch import Watchdog
 import cogs
 
-
-class InterceptHandler(logging.Handler):
-    def emit(self, record):
-        # Get corresponding Loguru level if it exists.
-        try:
-            level = logger.level(record.levelname).name
-        except ValueError:
-            level = record.levelno
-
-        # Find caller from where originated the logged message.
-        frame, depth = sys._getframe(6), 6
-        while frame and frame.f_code.co_filename == logging.__file__:
-            frame = frame.f_back
-            depth += 1
-
-        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
-
-
-logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
-logging.basicConfig(level=logging.DEBUG)
+startup.mark('imports')
 
 load_env(read_file(pathlib.Path("../.env")))
-
-plt.style.use("dark_background")
+logconfig.setup()
 
 intents = discord.Intents.default()
 intents.members = True
 intents.message_content = True
 
+# eager, lazy or never, see `bot.MEMBER_CACHE_MODES`
+MEMBER_CACHE = os.environ.get('MEMBER_CACHE', 'eager')
+# single: one process with one shard, auto: one process with all shards, cluster: one process per shard range
+SHARD_MODE = os.environ.get('SHARD_MODE', 'single')
 
-bot = ProjektBot(command_prefix=commands.when_mentioned_or("!"), intents=intents)
-bot.load_extensions(*[f'cogs.{item.stem}' for item in pathlib.Path(cogs.__file__).parent.iterdir() if item.is_file() and not item.stem.startswith("__")])
 
+def create_bot(sharded: bool = False, **options) -> ProjektBot:
+    cls = ShardedProjektBot if sharded else ProjektBot
+    bot = cls(command_prefix=commands.when_mentioned_or("!"), intents=intents, member_cache=MEMBER_CACHE, **options)
+    bot.load_extensions(*[f'cogs.{item.stem}' for item in pathlib.Path(cogs.__file__).parent.iterdir() if item.is_file() and not item.stem.startswith("__")])
+    return bot
 
-COMMAND_EXECUTION_TIME_PING = Gauge('command_execution_time_ping', 'The time that the ping command takes to execute')
-START_TIME = Gauge('bot_start_time', 'The timestamp when the bot was last started')
+
+COMMAND_EXECUTION_TIME_PING = Gauge('command_execution_time_ping', 'The time that the ping command takes to execute',
+                                    multiprocess_mode='livemax')
+# In cluster mode every worker sets it when it starts, the latest start of a running worker is served.
+START_TIME = Gauge('bot_start_time', 'The timestamp when the bot was last started', multiprocess_mode='livemax')
 EXCEPTION_COUNT = Counter("bot_exception_count", "Numerof exceptions from the Bot.")
 
 
-if __name__ == '__main__':
-    logger.info("Versionsinfo:")
-    logger.info(f'    Python {sys.version} auf {sys.platform}')
-    logger.info(f'    Pycord {discord.__version__}')
-    logger.info(f'    SQLAlchemy {sqlalchemy.__version__}')
-    logger.info(f'    dotenvy {dotenvy.__version__}')
-    logger.info(f'Let me join: {os.environ.get("JOIN_LINK")}')
-    start_http_server(9910)
+def run(bot: ProjektBot):
     START_TIME.set_to_current_time()
+    Watchdog(threshold=float(os.environ.get('WATCHDOG_THRESHOLD', 0.5))).start(bot.loop)
     try:
         with EXCEPTION_COUNT.count_exceptions():
             bot.run(os.environ.get("TOKEN"))
             ONLINE_STATE.state('stopped')
     except aiohttp.client_exceptions.ClientConnectionError as e:
         logger.error(f'Cound not connect to {e.host}:{e.port} {e.ssl} - {e.os_error}')
+
+
+def run_worker(shard_ids: list[int], shard_count: int):
+    """Entry point of the worker processes in cluster mode."""
+    run(create_bot(sharded=True, shard_ids=shard_ids, shard_count=shard_count))
+
+
+if __name__ == '__main__':
+    logger.info("Versionsinfo:")
+    logger.info(f'    Python {sys.version} auf {sys.platform}')
+    logger.info(f'    Pycord {discord.__version__}')
+    logger.info(f'    SQLAlchemy {sqlalchemy.__version__}')
+    logger.info(f'    dotenvy {dotenvy.__version__}')
+    logger.info(f'Let me join: {os.environ.get("JOIN_LINK")}')
+    if SHARD_MODE == 'cluster':
+        shard_count = os.environ.get('SHARD_COUNT')
+        workers = os.environ.get('CLUSTER_WORKERS')
+        cluster.run(run_worker, os.environ.get("TOKEN"), workers=int(workers) if workers else None,
+                    shard_count=int(shard_count) if shard_count else None)
+    else:
+        start_http_server(9910)
+        run(create_bot(sharded=SHARD_MODE == 'auto'))
@@ -0,0 +1,223 @@
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable
+
+from loguru import logger
+from sqlalchemy import bindparam, insert, or_, update
+from sqlalchemy.orm import Session
+
+from ClubDigital import models
+
+CHUNK_SIZE = 1000
+
+
+@dataclass
+class Reconciliation:
+    added: int = 0
+    renamed: int = 0
+    moved: int = 0
+    removed: int = 0
+    leaders: int = 0
+
+
+def reconcile_members(session: Session, members: Iterable[tuple[str, int, Iterable[int]]], roles: Iterable[int],
+                      complete: bool = True, chunk_size: int = CHUNK_SIZE) -> Reconciliation:
+    """
+    Brings the user database in line with the members of the guilds, after the bot was offline.
+
+    The gateway does not replay the events that were missed, so everything that the Members cog applies for single
+    events is applied here for all members at once: `members` are the names, ids and role ids of every member, `roles`
+    the ids of all roles of the guilds. New members are added and renamed members get their new name. Memberships and
+    leaders follow the project roles like in `update_member_roles`, but only for projects whose roles exist in the
+    guilds. A member of several guilds is listed once per guild, its roles are merged.
+
+    Users that are no longer a member are removed from their projects like in `remove_member` and leaders that are no
+    longer a member lose the lead. This only happens if `complete` is set, i.e. `members` are the members of all guilds
+    of the bot. A worker of a cluster only sees the guilds of its shards, users that are missing there may well be
+    members of the guilds of another worker. Without any members there is nothing to compare with, so nobody is removed
+    either.
+
+    The users and projects are loaded with one query each and compared in memory, only the differences are written.
+    """
+    result = Reconciliation()
+    merged = {}
+    for name, dc_id, role_ids in members:
+        merged.setdefault(dc_id, (name, set()))[1].update(role_ids)
+    members = merged
+    roles = set(roles)
+    complete = complete and bool(members)
+    users = {dc_id: (user_id, username, project_id) for user_id, dc_id, username, project_id
+             in session.query(models.User.id, models.User.dc_id, models.User.username, models.User.project_id)}
+    projects = session.query(models.Project).all()
+    by_role = {project.role: project.id for project in projects if project.role in roles}
+    by_leader_role = {project.leader_role: project.id for project in projects if project.leader_role in roles}
+    managed = set(by_role.values())
+
+    # Renames are applied before members are added, so the stale names of renamed users no longer block anyone.
+    renames = {dc_id: name for dc_id, (name, _) in members.items() if dc_id in users and users[dc_id][1] != name}
+    taken = {username for dc_id, (_, username, _) in users.items() if dc_id not in renames}
+    while True:
+        targets = Counter(renames.values())
+        blocked = [dc_id for dc_id, name in renames.items() if name in taken or targets[name] > 1]
+        if not blocked:
+            break
+        for dc_id in blocked:
+            logger.warning(f'Could not rename {users[dc_id][1]}#{dc_id} to {renames.pop(dc_id)}, '
+                           f'the username is already taken by another user.')
+            taken.add(users[dc_id][1])
+    if renames:
+        # Two users may have swapped their names, so the old names are released before the new ones are set.
+        _update_users(session, 'username', {users[dc_id][0]: None for dc_id in renames}, chunk_size)
+        _update_users(session, 'username', {users[dc_id][0]: name for dc_id, name in renames.items()}, chunk_size)
+        taken.update(renames.values())
+        result.renamed = len(renames)
+
+    missing = []
+    moves = {}
+    leaders = {}
+    for dc_id, (name, role_ids) in members.items():
+        member_of = [by_role[role] for role in role_ids if role in by_role]
+        for role in role_ids:
+            if role in by_leader_role:
+                leaders[by_leader_role[role]] = dc_id
+        if dc_id not in users:
+            if name in taken:
+                logger.warning(f'Could not enlist {name}#{dc_id}, the username is already taken by another user.')
+                continue
+            taken.add(name)
+            missing.append({'username': name, 'dc_id': dc_id, 'project_id': member_of[0] if member_of else None})
+            continue
+        user_id, _, project_id = users[dc_id]
+        if member_of and project_id not in member_of:
+            moves[user_id] = member_of[0]
+        elif not member_of and project_id in managed:
+            moves[user_id] = None
+    result.moved = len(moves)
+    for dc_id, (user_id, _, project_id) in users.items():
+        if complete and dc_id not in members and project_id is not None:
+            moves[user_id] = None
+            result.removed += 1
+    _update_users(session, 'project_id', moves, chunk_size)
+
+    for start in range(0, len(missing), chunk_size):
+        session.execute(insert(models.User.__table__), missing[start:start + chunk_size])
+    result.added = len(missing)
+    # The ids of the users that were just added are only known after the insert.
+    ids = {dc_id: user[0] for dc_id, user in users.items()}
+    new_leaders = [dc_id for dc_id in leaders.values() if dc_id not in ids]
+    if new_leaders:
+        ids.update(session.query(models.User.dc_id, models.User.id).filter(models.User.dc_id.in_(new_leaders)))
+    present = {user[0] for dc_id, user in users.items() if dc_id in members}
+    for project in projects:
+        if project.id in leaders:
+            leader = ids.get(leaders[project.id])
+        elif project.leader_role in roles or complete and project.leader not in present:
+            leader = None
+        else:
+            leader = project.leader
+        if project.leader != leader:
+            project.leader = leader
+            result.leaders += 1
+    session.commit()
+    if any(vars(result).values()):
+        logger.info(f'Reconciled the members: {result}.')
+    return result
+
+
+def _update_users(session: Session, column: str, values: dict[int, object], chunk_size: int):
+    """Sets `column` of the users with the ids in `values` to the mapped value, in chunks of `chunk_size` rows."""
+    table = models.User.__table__
+    statement = update(table).where(table.c.id == bindparam('user_id')).values({column: bindparam('value')})
+    rows = [{'user_id': user_id, 'value': value} for user_id, value in values.items()]
+    for start in range(0, len(rows), chunk_size):
+        session.execute(statement, rows[start:start + chunk_size])
+
+
+def enlist_member(session: Session, name: str, dc_id: int):
+    """Adds a member that joined a guild or updates the username, if the member is already known."""
+    instance = session.query(models.User).filter_by(dc_id=dc_id).first()
+    if not instance:
+        logger.info(f'Enlisted {name}#{dc_id} into user database.')
+        session.add(models.User(name, dc_id))
+    elif instance.username != name:
+        instance.username = name
+    session.commit()
+
+
+def enlist_members(session: Session, members: dict[int, str]) -> int:
+    """
+    Like `enlist_member` for many members at once, `members` maps the discord id to the username.
+
+    Everything is written in a single transaction. Members whose username is already taken by another user are
+    skipped, so a single conflict does not roll back the whole batch. Returns the number of users that were added.
+    """
+    known = {user.dc_id: user for user in session.query(models.User).filter(models.User.dc_id.in_(members))}
+    taken = {name for name, in session.query(models.User.username).filter(models.User.username.in_(members.values()))}
+    missing = []
+    for dc_id, name in members.items():
+        user = known.get(dc_id)
+        if user is not None and user.username == name:
+            continue
+        if name in taken:
+            logger.warning(f'Could not enlist {name}#{dc_id}, the username is already taken by another user.')
+            continue
+        taken.add(name)
+        if user is None:
+            missing.append({'username': name, 'dc_id': dc_id})
+        else:
+            logger.info(f'Renamed {user.username}#{dc_id} to {name}.')
+            user.username = name
+    if missing:
+        session.execute(insert(models.User.__table__), missing)
+        logger.info(f'Enlisted {len(missing)} users into user database.')
+    session.commit()
+    return len(missing)
+
+
+def rename_member(session: Session, dc_id: int, name: str):
+    instance = session.query(models.User).filter_by(dc_id=dc_id).first()
+    if instance and instance.username != name:
+        logger.info(f'Renamed {instance.username}#{dc_id} to {name}.')
+        instance.username = name
+        session.commit()
+
+
+def remove_member(session: Session, dc_id: int):
+    """Removes a member that left the guild from its project. The user itself is kept in the database."""
+    instance = session.query(models.User).filter_by(dc_id=dc_id).first()
+    if not instance:
+        return
+    for project in session.query(models.Project).filter_by(leader=instance.id):
+        project.leader = None
+    instance.project_id = None
+    session.commit()
+
+
+def update_member_roles(session: Session, dc_id: int, role_ids: Iterable[int]):
+    """
+    Applies the discord roles of a member to the database.
+
+    A member with the role of a project is a member of that project, a member with the leader role of a project
+    is its leader. If the member lost these roles, the membership and the leadership are revoked.
+    """
+    instance = session.query(models.User).filter_by(dc_id=dc_id).first()
+    if not instance:
+        return
+    role_ids = set(role_ids)
+    projects = session.query(models.Project).filter(or_(models.Project.role.in_(role_ids),
+                                                        models.Project.leader_role.in_(role_ids),
+                                                        models.Project.leader == instance.id)).all()
+    member_of = [project for project in projects if project.role in role_ids]
+    if member_of and instance.project_id not in [project.id for project in member_of]:
+        instance.project_id = member_of[0].id
+    elif not member_of and instance.project_id is not None:
+        current = session.get(models.Project, instance.project_id)
+        if current and current.role not in role_ids:
+            instance.project_id = None
+    for project in projects:
+        if project.leader_role in role_ids:
+            project.leader = instance.id
+        elif project.leader == instance.id:
+            project.leader = None
+    session.commit()
+
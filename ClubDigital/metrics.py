@@ -1,6 +1,94 @@
-from prometheus_client import Histogram, Enum, Gauge, Counter
+import contextlib
+import sys
+import types
+from typing import Iterator
 
-PROCESS_TIME = Histogram("bot_process_time", "Time that the commands take to prcess")
-ONLINE_STATE = Enum('bot_online_state', 'Is the Bot online', states=['starting', 'online', 'offline', 'stopping', 'stopped'])
-DATABASE_CONNECTED = Gauge('bot_main_database_connected', 'Databse connection status for the main bot.')
-COMMAND_COUNT = Counter('bot_command_count', 'Number of commands executed.')
\ No newline at end of file
+from prometheus_client import Histogram, Gauge, Counter, REGISTRY
+from prometheus_client.metrics import MetricWrapperBase
+
+PROCESS_TIME = Histogram("bot_process_time", "Time that the commands take to prcess", ['cog', 'command'])
+DATABASE_CONNECTED = Gauge('bot_main_database_connected', 'Databse connection status for the main bot.',
+                           multiprocess_mode='livemax')
+COMMAND_COUNT = Counter('bot_command_count', 'Number of commands executed.', ['cog', 'command'])
+COMMAND_ERRORS = Counter('bot_command_errors', 'Number of commands that failed.', ['cog', 'command'])
+QUERY_COUNT = Counter('bot_database_queries', 'Number of executed SQL statements.', ['statement'])
+QUERY_TIME = Histogram('bot_database_query_time', 'Time that the SQL statements take to execute.', ['statement'])
+STARTUP_PHASES = Gauge('bot_startup_phase_seconds', 'Duration of the phases of the last start.', ['phase'],
+                       multiprocess_mode='livemax')
+EXTENSION_LOAD_TIME = Gauge('bot_extension_load_seconds', 'Time that loading an extension took.', ['extension'],
+                            multiprocess_mode='livemax')
+EXTENSION_RELOAD_TIME = Histogram('bot_extension_reload_seconds', 'Duration of the reloads of an extension.', ['extension'])
+CACHE_HITS = Counter('bot_cache_hits', 'Number of lookups that were answered from the cache.', ['cache'])
+CACHE_MISSES = Counter('bot_cache_misses', 'Number of lookups that had to go to the database.', ['cache'])
+WRITE_QUEUE_DEPTH = Gauge('bot_write_queue_depth', 'Number of rows that wait in a write-behind queue.', ['queue'],
+                          multiprocess_mode='livesum')
+WRITE_FLUSH_TIME = Histogram('bot_write_flush_seconds', 'Time that flushing a write-behind queue takes.', ['queue'])
+WRITE_FLUSH_ROWS = Counter('bot_write_flushed_rows', 'Number of rows written by a write-behind queue.', ['queue'])
+LOG_RECORDS = Counter('bot_log_records', 'Number of log records that were written.', ['level'])
+LOG_DROPPED = Counter('bot_log_dropped', 'Number of log records that were dropped.', ['reason'])
+REST_QUEUE_DEPTH = Gauge('bot_rest_queue_depth', 'Number of REST calls that wait for their rate limit bucket.',
+                         ['route'], multiprocess_mode='livesum')
+REST_RATE_LIMITS = Counter('bot_rest_rate_limits', 'Number of 429 responses from Discord.', ['route'])
+REST_MERGED_EDITS = Counter('bot_rest_merged_role_edits', 'Number of role edits that were merged into another one.')
+SESSIONS_OPEN = Gauge('bot_database_sessions_open', 'Number of ORM sessions that are currently open.', ['engine'],
+                      multiprocess_mode='livesum')
+SESSION_LIFETIME = Histogram('bot_database_session_seconds', 'Time from opening to closing an ORM session.', ['engine'],
+                             buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, float('inf')))
+SESSION_IDENTITY_MAP = Histogram('bot_database_session_identity_map', 'Largest number of rows in the identity map of '
+                                 'a session.', ['engine'],
+                                 buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000, float('inf')))
+
+
+class OnlineState:
+    """
+    Like the `Enum` of prometheus_client, which is not supported in multiprocess mode.
+
+    Every state is a series of a gauge that is 1 for the current state and 0 otherwise, with the same names as the
+    series of an `Enum`. In a cluster the gauge counts the workers that are in a state, workers that ended are left out.
+    """
+    def __init__(self, name: str, documentation: str, states: list[str]):
+        self.states = states
+        self._gauge = Gauge(name, documentation, [name], multiprocess_mode='livesum')
+
+    def state(self, state: str):
+        for name in self.states:
+            self._gauge.labels(name).set(1 if name == state else 0)
+
+
+ONLINE_STATE = OnlineState('bot_online_state', 'Is the Bot online',
+                           ['starting', 'online', 'offline', 'stopping', 'stopped'])
+
+
+def defined_in(module: types.ModuleType) -> list[MetricWrapperBase]:
+    """The metrics that were created at the top level of `module`, metrics imported from other modules are left out."""
+    imported = {id(value) for other in list(sys.modules.values()) if other is not module
+                for value in getattr(other, '__dict__', {}).values() if isinstance(value, MetricWrapperBase)}
+    return [value for value in vars(module).values()
+            if isinstance(value, MetricWrapperBase) and id(value) not in imported]
+
+
+def unregister(collectors: list[MetricWrapperBase]):
+    """Removes the metrics from the registry, so a reloaded module can create them again."""
+    for collector in collectors:
+        REGISTRY.unregister(collector)
+
+
+def register(collectors: list[MetricWrapperBase]):
+    for collector in collectors:
+        REGISTRY.register(collector)
+
+
+@contextlib.contextmanager
+def recording() -> Iterator[list[MetricWrapperBase]]:
+    """Collects the metrics that are registered within the block."""
+    collectors = []
+    register = REGISTRY.register
+
+    def record(collector):
+        register(collector)
+        collectors.append(collector)
+    REGISTRY.register = record
+    try:
+        yield collectors
+    finally:
+        del REGISTRY.register
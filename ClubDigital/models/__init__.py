@@ -1,3 +1,4 @@
 from .project import Project, Repo
 from .user import User
-from .base import Base
\ No newline at end of file
+from .latency import LatencySample, LatencyRollup
+from .base import Base
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, BigInteger, Float
+from .base import Base
+
+
+class LatencySample(Base):
+    __tablename__ = 'latency_samples'
+
+    timestamp = Column(BigInteger, primary_key=True, autoincrement=False)
+    value = Column(Float, nullable=False)
+
+
+class LatencyRollup(Base):
+    __tablename__ = 'latency_rollups'
+
+    resolution = Column(Integer, primary_key=True, autoincrement=False)
+    bucket = Column(BigInteger, primary_key=True, autoincrement=False)
+    minimum = Column(Float, nullable=False)
+    average = Column(Float, nullable=False)
+    maximum = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey
+from sqlalchemy import Column, String, Integer, BigInteger, ForeignKey
 from .base import Base
 from sqlalchemy.orm import relationship
 
@@ -9,12 +9,13 @@ class Project(Base):
     name = Column(String, nullable=False, unique=True)
     description = Column(String, nullable=True)
     leader = Column(Integer)
-    role = Column(Integer, nullable=False, unique=True, default=0)
-    leader_role = Column(Integer, nullable=False, unique=True, default=0)
+    role = Column(BigInteger, nullable=False, unique=True, default=0)
+    leader_role = Column(BigInteger, nullable=False, unique=True, default=0)
     color = Column(String, default="10ff10")
 
     repository = relationship("Repo")
     users = relationship("User")
+    leader_user = relationship("User", primaryjoin="foreign(Project.leader) == User.id", viewonly=True, uselist=False)
 
     def __init__(self, name: str, description: str, role: int, lr: int):
         super(Project, self).__init__()
@@ -27,7 +28,7 @@ class Project(Base):
 class Repo(Base):
     __tablename__ = "repos"
     id = Column(Integer, primary_key=True)
-    project = Column(ForeignKey("projects.id"))
+    project = Column(ForeignKey("projects.id"), index=True)
     label = Column(String, nullable=False)
     link = Column(String, nullable=False)
 
@@ -1,7 +1,7 @@
 from .base import Base
 from sqlalchemy.orm import relationship
 
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey
 
 
 class User(Base):
@@ -9,8 +9,8 @@ class User(Base):
 
     id = Column(Integer(), autoincrement=True, unique=True, nullable=True, primary_key=True)
     username = Column(String(), unique=True)
-    project_id = Column(Integer, ForeignKey("projects.id"))
-    dc_id = Column(String(), unique=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+    dc_id = Column(BigInteger, unique=True)
     birth_year = Column(Integer)
     class_name = Column(String)
 
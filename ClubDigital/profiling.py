@@ -0,0 +1,121 @@
+"""
+Profiling of a single command invocation, see `!debug profile` of the Debug cog.
+
+The SQL statements and the requests to Discord are counted through a context variable, so only the task that runs the
+command and the tasks it creates are attributed to the profile. The database functions run on their own threads,
+`database` hands the profile to these threads with `bind` and counts the statements with `count_statement`.
+
+The function statistics are not scoped like that: `Profile.main` profiles the whole thread of the event loop while the
+command runs, so heartbeats, other commands and the parsing of gateway events in that time show up as well.
+"""
+import cProfile
+import contextlib
+import functools
+import io
+import marshal
+import os
+import pstats
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Iterator, TypeVar
+
+if TYPE_CHECKING:
+    from discord.http import HTTPClient
+
+T = TypeVar('T')
+
+
+@dataclass
+class Profile:
+    main: cProfile.Profile = field(default_factory=cProfile.Profile)
+    threads: list[cProfile.Profile] = field(default_factory=list)
+    statements: Counter = field(default_factory=Counter)
+    requests: Counter = field(default_factory=Counter)
+    duration: float = 0.0
+
+    def stats(self) -> pstats.Stats:
+        """The statistics of the event loop and the database threads together."""
+        stats = pstats.Stats(self.main, stream=io.StringIO())
+        for profiler in self.threads:
+            stats.add(profiler)
+        return stats
+
+    def dump(self) -> bytes:
+        """The statistics in the format of `pstats.Stats.dump_stats`, e.g. for snakeviz."""
+        return marshal.dumps(self.stats().stats)
+
+    def table(self, limit: int = 15, sort: str = 'tottime') -> str:
+        """The `limit` functions with the highest `sort` value as fixed width table."""
+        stats = self.stats().sort_stats(sort)
+        lines = [f'{"calls":>8} {"tottime":>8} {"cumtime":>8}  function']
+        for function in stats.fcn_list[:limit]:
+            _, calls, tottime, cumtime, _ = stats.stats[function]
+            filename, line, name = function
+            location = f'{os.path.basename(filename)}:{line}({name})' if line else name
+            lines.append(f'{calls:>8} {tottime:>8.4f} {cumtime:>8.4f}  {location[-70:]}')
+        return '\n'.join(lines)
+
+
+current: ContextVar[Profile | None] = ContextVar('profile', default=None)
+
+
+@contextlib.contextmanager
+def profile() -> Iterator[Profile]:
+    """
+    Profiles the block on the current thread and the database functions that the current task hands to other threads.
+    """
+    result = Profile()
+    token = current.set(result)
+    start = time.perf_counter()
+    result.main.enable()
+    try:
+        yield result
+    finally:
+        result.main.disable()
+        result.duration = time.perf_counter() - start
+        current.reset(token)
+
+
+def bind(func: Callable[..., T]) -> Callable[..., T]:
+    """Lets `func` report to the profile of the calling task, when it is called on another thread."""
+    result = current.get()
+    if result is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = cProfile.Profile()
+        result.threads.append(profiler)
+        token = current.set(result)
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            current.reset(token)
+    return wrapper
+
+
+def count_statement(statement_type: str):
+    result = current.get()
+    if result is not None:
+        result.statements[statement_type] += 1
+
+
+@contextlib.contextmanager
+def count_requests(http: 'HTTPClient'):
+    """Counts the REST calls of the profiled tasks per route, while the block runs."""
+    request = http.request
+
+    async def counted(route, **kwargs):
+        result = current.get()
+        if result is not None:
+            result.requests[f'{route.method} {route.path}'] += 1
+        return await request(route, **kwargs)
+    http.request = counted
+    try:
+        yield
+    finally:
+        http.request = request
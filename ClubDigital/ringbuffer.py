@@ -0,0 +1,60 @@
+import time
+
+import numpy
+
+
+class RingBuffer:
+    """
+    A fixed size history of float values with their timestamps.
+
+    The samples are stored in two preallocated NumPy arrays (float32 values and int64 timestamps in milliseconds
+    since the epoch), so appending is O(1) and one sample only takes 12 bytes. `version` is increased with every
+    appended sample and can be used to detect changes.
+    """
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError('The capacity of a ring buffer has to be at least 1.')
+        self.capacity = capacity
+        self.values = numpy.zeros(capacity, dtype=numpy.float32)
+        self.timestamps = numpy.zeros(capacity, dtype=numpy.int64)
+        self.version = 0
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, value: float, timestamp: int | None = None):
+        """Adds a sample, `timestamp` defaults to now and is given in milliseconds since the epoch."""
+        if timestamp is None:
+            timestamp = time.time_ns() // 1_000_000
+        self.values[self._next] = value
+        self.timestamps[self._next] = timestamp
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.version += 1
+
+    def last(self) -> float | None:
+        if self._size == 0:
+            return None
+        return float(self.values[self._next - 1])
+
+    def window(self, seconds: float | None = None) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """Returns the timestamps and values of the last `seconds` (or all samples) in chronological order."""
+        if self._size < self.capacity:
+            timestamps, values = self.timestamps[:self._size], self.values[:self._size]
+        else:
+            timestamps = numpy.concatenate((self.timestamps[self._next:], self.timestamps[:self._next]))
+            values = numpy.concatenate((self.values[self._next:], self.values[:self._next]))
+        if seconds is not None and self._size > 0:
+            start = numpy.searchsorted(timestamps, timestamps[-1] - int(seconds * 1000))
+            timestamps, values = timestamps[start:], values[start:]
+        return timestamps, values
+
+    def stats(self, seconds: float | None = None) -> tuple[float, float, float] | None:
+        """Returns minimum, median and maximum of the window, ignoring values that are not finite."""
+        _, values = self.window(seconds)
+        values = values[numpy.isfinite(values)]
+        if len(values) == 0:
+            return None
+        return float(values.min()), float(numpy.median(values)), float(values.max())
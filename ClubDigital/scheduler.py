@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+import discord
+from loguru import logger
+
+from ClubDigital.metrics import REST_QUEUE_DEPTH, REST_RATE_LIMITS, REST_MERGED_EDITS
+
+T = TypeVar('T')
+
+# Requests of the same rate limit bucket wait in a queue, at most this many of them run at once. Messages of a channel
+# are sent one after another, so they keep their order.
+CONCURRENCY_PER_BUCKET = 5
+CONCURRENCY_PER_CHANNEL = 1
+# Upper limit for the requests in flight over all buckets, stays well below the global limit of 50 requests per second.
+GLOBAL_CONCURRENCY = 25
+
+
+class RateLimitCounter(logging.Filter):
+    """
+    Counts the 429 responses that pycord handles internally.
+
+    pycord only logs them as warnings of `discord.http`, with the bucket `channel_id:guild_id:path` as argument.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = str(record.msg)
+        if message.startswith('We are being rate limited.'):
+            REST_RATE_LIMITS.labels(str(record.args[1]).split(':', 2)[-1]).inc()
+        elif message.startswith('Global rate limit has been hit.'):
+            REST_RATE_LIMITS.labels('global').inc()
+        return True
+
+
+_rate_limit_counter = RateLimitCounter()
+
+
+@dataclass
+class _RoleEdit:
+    member: discord.Member
+    add: set[int]
+    remove: set[int]
+    reason: str | None
+    result: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+    def merge(self, add: set[int], remove: set[int], reason: str | None):
+        """Later changes win, a role that is added again is no longer removed and vice versa."""
+        self.add = (self.add - remove) | add
+        self.remove = (self.remove - add) | remove
+        self.reason = reason or self.reason
+
+
+class RestScheduler:
+    """
+    Queues the outgoing REST calls of the bot per rate limit bucket.
+
+    Independent buckets run concurrently, within a bucket the calls wait in FIFO order. Role edits of a member that are
+    still waiting are merged into a single request.
+    """
+    def __init__(self):
+        self._buckets: dict[str, asyncio.Semaphore] = {}
+        self._global = asyncio.Semaphore(GLOBAL_CONCURRENCY)
+        self._role_edits: dict[tuple[int, int], _RoleEdit] = {}
+        logging.getLogger('discord.http').addFilter(_rate_limit_counter)
+
+    def _semaphore(self, bucket: str, concurrency: int) -> asyncio.Semaphore:
+        if bucket not in self._buckets:
+            self._buckets[bucket] = asyncio.Semaphore(concurrency)
+        return self._buckets[bucket]
+
+    async def request(self, route: str, major: int, func: Callable[..., Awaitable[T]], *args,
+                      concurrency: int = CONCURRENCY_PER_BUCKET, **kwargs) -> T:
+        """
+        Calls `func` as soon as the bucket has a free slot.
+
+        `route` is the route of Discord's API, like `POST /guilds/{guild_id}/roles`, `major` the value of its major
+        parameter (channel or guild id). Both together identify the rate limit bucket.
+        """
+        REST_QUEUE_DEPTH.labels(route).inc()
+        waiting = True
+        try:
+            async with self._semaphore(f'{route}:{major}', concurrency), self._global:
+                REST_QUEUE_DEPTH.labels(route).dec()
+                waiting = False
+                return await func(*args, **kwargs)
+        finally:
+            if waiting:
+                REST_QUEUE_DEPTH.labels(route).dec()
+
+    async def send(self, channel_id: int, send: Callable[..., Awaitable[discord.Message]], *args,
+                   **kwargs) -> discord.Message:
+        return await self.request('POST /channels/{channel_id}/messages', channel_id, send, *args,
+                                  concurrency=CONCURRENCY_PER_CHANNEL, **kwargs)
+
+    async def create_role(self, guild: discord.Guild, **kwargs) -> discord.Role:
+        return await self.request('POST /guilds/{guild_id}/roles', guild.id, guild.create_role, **kwargs)
+
+    async def delete_role(self, role: discord.Role, reason: str | None = None):
+        await self.request('DELETE /guilds/{guild_id}/roles/{role_id}', role.guild.id, role.delete, reason=reason)
+
+    async def _apply_role_edit(self, key: tuple[int, int]) -> bool:
+        edit = self._role_edits.pop(key)
+        member = edit.member
+        current = {role.id for role in member.roles if role != member.guild.default_role}
+        wanted = (current - edit.remove) | edit.add
+        if wanted == current:
+            return True
+        try:
+            await member.edit(roles=[discord.Object(role) for role in wanted], reason=edit.reason)
+        except discord.HTTPException as e:
+            logger.error(f'Could not change the roles of {member.name}#{member.id}: {e}')
+            return False
+        return True
+
+    async def edit_member_roles(self, member: discord.Member, add: Iterable[int] = (), remove: Iterable[int] = (),
+                                reason: str | None = None) -> bool:
+        """
+        Adds and removes the given roles with a single request.
+
+        If another edit of the member is still waiting, both are merged and share the request. Returns `False`, if
+        Discord rejected the change.
+        """
+        add = set(add)
+        remove = set(remove) - add
+        key = (member.guild.id, member.id)
+        if key in self._role_edits:
+            REST_MERGED_EDITS.inc()
+            edit = self._role_edits[key]
+            edit.merge(add, remove, reason)
+            return await asyncio.shield(edit.result)
+        edit = self._role_edits[key] = _RoleEdit(member, add, remove, reason)
+        try:
+            result = await self.request('PATCH /guilds/{guild_id}/members/{user_id}', member.guild.id,
+                                        self._apply_role_edit, key)
+        except BaseException as e:
+            if self._role_edits.get(key) is edit:
+                del self._role_edits[key]
+            if isinstance(e, asyncio.CancelledError):
+                edit.result.cancel()
+            else:
+                edit.result.set_exception(e)
+                # Only merged edits wait for the future, nobody else has to see the exception.
+                edit.result.exception()
+            raise
+        edit.result.set_result(result)
+        return result
+
+    async def edit_roles(self, changes: Iterable[tuple[discord.Member, Iterable[int], Iterable[int]]],
+                         reason: str | None = None) -> list[discord.Member]:
+        """
+        Applies the role changes `(member, add, remove)` to all members concurrently.
+
+        Returns the members whose roles could not be changed.
+        """
+        changes = list(changes)
+        results = await asyncio.gather(*[self.edit_member_roles(member, add, remove, reason)
+                                         for member, add, remove in changes])
+        return [member for (member, _, _), success in zip(changes, results) if not success]
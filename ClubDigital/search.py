@@ -0,0 +1,167 @@
+"""
+In-memory indexes over the names of the projects and the labels of their repositories.
+
+The prefix trie answers the autocomplete requests of the slash commands, the trigram index finds similar names for
+"did you mean" suggestions. Both are case insensitive and small enough to be rebuilt from the database at startup.
+"""
+import heapq
+from collections import Counter, defaultdict
+from typing import Iterator
+
+from sqlalchemy.orm import Session
+
+from ClubDigital import models
+
+
+def trigrams(text: str) -> set[str]:
+    """The trigrams of `text`, padded, so that the first and the last characters have their own trigrams."""
+    padded = f'  {text.lower()} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Node:
+    __slots__ = ('children', 'keys')
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.keys: set[str] = set()
+
+
+class Trie:
+    """A prefix tree over strings, every node keeps the original spelling of the keys that end in it."""
+    def __init__(self):
+        self.root = _Node()
+
+    def add(self, key: str):
+        node = self.root
+        for char in key.lower():
+            node = node.children.setdefault(char, _Node())
+        node.keys.add(key)
+
+    def remove(self, key: str):
+        path = [self.root]
+        for char in key.lower():
+            if char not in path[-1].children:
+                return
+            path.append(path[-1].children[char])
+        path[-1].keys.discard(key)
+        # Prune the branches that no longer lead to a key.
+        for char, node, parent in zip(reversed(key.lower()), reversed(path), reversed(path[:-1])):
+            if node.keys or node.children:
+                break
+            del parent.children[char]
+
+    def _walk(self, node: _Node) -> Iterator[str]:
+        yield from sorted(node.keys)
+        for char in sorted(node.children):
+            yield from self._walk(node.children[char])
+
+    def complete(self, prefix: str, limit: int = 25) -> list[str]:
+        """Returns up to `limit` keys that start with `prefix`, in alphabetical order."""
+        node = self.root
+        for char in prefix.lower():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        result = []
+        for key in self._walk(node):
+            result.append(key)
+            if len(result) == limit:
+                break
+        return result
+
+
+class TrigramIndex:
+    def __init__(self):
+        self.postings: dict[str, set[str]] = defaultdict(set)
+        self.sizes: dict[str, int] = {}
+
+    def add(self, key: str):
+        grams = trigrams(key)
+        self.sizes[key] = len(grams)
+        for gram in grams:
+            self.postings[gram].add(key)
+
+    def remove(self, key: str):
+        if self.sizes.pop(key, None) is None:
+            return
+        for gram in trigrams(key):
+            self.postings[gram].discard(key)
+            if not self.postings[gram]:
+                del self.postings[gram]
+
+    def similar(self, text: str, limit: int = 3, threshold: float = 0.3) -> list[str]:
+        """Returns up to `limit` keys whose trigram similarity (Jaccard) to `text` is at least `threshold`."""
+        grams = trigrams(text)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        scores = ((count / (len(grams) + self.sizes[key] - count), key) for key, count in shared.items())
+        return [key for score, key in heapq.nlargest(limit, scores) if score >= threshold]
+
+
+class NameIndex:
+    """Exact, prefix and similarity lookups over a set of names."""
+    def __init__(self, names=()):
+        self.names: set[str] = set()
+        self.trie = Trie()
+        self.trigrams = TrigramIndex()
+        for name in names:
+            self.add(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name: str):
+        if name not in self.names:
+            self.names.add(name)
+            self.trie.add(name)
+            self.trigrams.add(name)
+
+    def remove(self, name: str):
+        if name in self.names:
+            self.names.discard(name)
+            self.trie.remove(name)
+            self.trigrams.remove(name)
+
+    def complete(self, prefix: str, limit: int = 25) -> list[str]:
+        return self.trie.complete(prefix, limit)
+
+    def suggest(self, name: str, limit: int = 3) -> list[str]:
+        return self.trigrams.similar(name, limit)
+
+
+class ProjectIndex:
+    """The names of all projects and the labels of the repositories of every project."""
+    def __init__(self):
+        self.projects = NameIndex()
+        self.repos: dict[str, NameIndex] = defaultdict(NameIndex)
+
+    @classmethod
+    def load(cls, session: Session) -> 'ProjectIndex':
+        index = cls()
+        for name, in session.query(models.Project.name):
+            index.add_project(name)
+        for name, label in session.query(models.Project.name, models.Repo.label).join(models.Repo):
+            index.add_repo(name, label)
+        return index
+
+    def add_project(self, name: str):
+        self.projects.add(name)
+
+    def remove_project(self, name: str):
+        self.projects.remove(name)
+        self.repos.pop(name, None)
+
+    def add_repo(self, project: str, label: str):
+        self.repos[project].add(label)
+
+    def remove_repo(self, project: str, label: str):
+        if project in self.repos:
+            self.repos[project].remove(label)
+
+    def complete_repo(self, project: str, prefix: str, limit: int = 25) -> list[str]:
+        return self.repos[project].complete(prefix, limit) if project in self.repos else []
@@ -0,0 +1,38 @@
+import time
+from contextlib import contextmanager
+
+from loguru import logger
+
+from ClubDigital.metrics import STARTUP_PHASES
+
+# Reference point of the startup, main.py imports this module before anything else.
+STARTED = time.perf_counter()
+
+_marks: dict[str, float] = {}
+
+
+def record(phase: str, seconds: float):
+    STARTUP_PHASES.labels(phase).set(seconds)
+    logger.debug(f'Startup phase "{phase}" took {seconds * 1000:.1f} ms.')
+
+
+@contextmanager
+def phase(name: str):
+    """Measures the duration of the block as startup phase `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def mark(name: str, since: str | None = None):
+    """
+    Records the time since the mark `since` (or the start) as phase `name`.
+
+    Only the first mark of every phase is recorded, so reconnects do not overwrite the values of the startup.
+    """
+    if name in _marks:
+        return
+    _marks[name] = time.perf_counter()
+    record(name, _marks[name] - _marks.get(since, STARTED))
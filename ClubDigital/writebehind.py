@@ -0,0 +1,91 @@
+import asyncio
+import time
+import weakref
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+from loguru import logger
+
+from ClubDigital.metrics import WRITE_QUEUE_DEPTH, WRITE_FLUSH_TIME, WRITE_FLUSH_ROWS
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+_queues: weakref.WeakSet = weakref.WeakSet()
+
+
+class WriteBehindQueue(Generic[K, V]):
+    """
+    Collects writes and hands them to `write` in batches.
+
+    A later `put` for the same key replaces the pending value, so bursts of events for the same row are coalesced.
+    The batch is written `interval` seconds after the first pending write or as soon as `max_rows` rows are
+    pending, whichever comes first.
+    """
+    def __init__(self, name: str, write: Callable[[dict[K, V]], Awaitable], interval: float = 0.5,
+                 max_rows: int = 500):
+        self.name = name
+        self.interval = interval
+        self.max_rows = max_rows
+        self._write = write
+        self._pending: dict[K, V] = {}
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._waiter: asyncio.Task | None = None
+        _queues.add(self)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._pending
+
+    def put(self, key: K, value: V):
+        self._pending[key] = value
+        WRITE_QUEUE_DEPTH.labels(self.name).set(len(self._pending))
+        if len(self._pending) >= self.max_rows:
+            self._full.set()
+        if self._waiter is None or self._waiter.done():
+            self._waiter = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        while self._pending:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def drain(self) -> dict[K, V]:
+        """Takes the pending rows without writing them, e.g. to hand them over to another queue."""
+        pending, self._pending = self._pending, {}
+        WRITE_QUEUE_DEPTH.labels(self.name).set(0)
+        return pending
+
+    async def flush(self):
+        """Writes the pending rows now. A failed batch is logged and dropped."""
+        async with self._lock:
+            self._full.clear()
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            WRITE_QUEUE_DEPTH.labels(self.name).set(0)
+            start = time.perf_counter()
+            try:
+                await self._write(batch)
+                WRITE_FLUSH_ROWS.labels(self.name).inc(len(batch))
+            except Exception:
+                logger.exception(f'Could not write {len(batch)} rows of the {self.name} queue.')
+            finally:
+                WRITE_FLUSH_TIME.labels(self.name).observe(time.perf_counter() - start)
+
+    async def close(self):
+        """Writes the pending rows and stops the timer."""
+        await self.flush()
+        if self._waiter is not None:
+            self._waiter.cancel()
+        _queues.discard(self)
+
+
+async def flush_all():
+    """Writes the pending rows of every open queue, e.g. before the bot shuts down."""
+    await asyncio.gather(*[queue.flush() for queue in list(_queues)])
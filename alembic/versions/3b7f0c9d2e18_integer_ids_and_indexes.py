@@ -0,0 +1,61 @@
+"""Integer Discord IDs and indexes
+
+Revision ID: 3b7f0c9d2e18
+Revises: 8e3d2f61a7c5
+Create Date: 2026-10-18 16:02:44.315207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7f0c9d2e18'
+down_revision = '8e3d2f61a7c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The batch operations recreate the tables on SQLite, the existing values are converted with CAST.
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('dc_id',
+               existing_type=sa.String(),
+               type_=sa.BigInteger(),
+               existing_nullable=True)
+        batch_op.create_index(batch_op.f('ix_users_project_id'), ['project_id'], unique=False)
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.alter_column('role',
+               existing_type=sa.Integer(),
+               type_=sa.BigInteger(),
+               existing_nullable=False)
+        batch_op.alter_column('leader_role',
+               existing_type=sa.Integer(),
+               type_=sa.BigInteger(),
+               existing_nullable=False)
+
+    with op.batch_alter_table('repos', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_repos_project'), ['project'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('repos', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_repos_project'))
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.alter_column('leader_role',
+               existing_type=sa.BigInteger(),
+               type_=sa.Integer(),
+               existing_nullable=False)
+        batch_op.alter_column('role',
+               existing_type=sa.BigInteger(),
+               type_=sa.Integer(),
+               existing_nullable=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_project_id'))
+        batch_op.alter_column('dc_id',
+               existing_type=sa.BigInteger(),
+               type_=sa.String(),
+               existing_nullable=True)
@@ -0,0 +1,38 @@
+"""Latency time series
+
+Revision ID: 8e3d2f61a7c5
+Revises: d41bffbd864e
+Create Date: 2026-10-18 13:41:07.918553
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e3d2f61a7c5'
+down_revision = 'd41bffbd864e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('latency_samples',
+    sa.Column('timestamp', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('timestamp')
+    )
+    op.create_table('latency_rollups',
+    sa.Column('resolution', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('bucket', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('minimum', sa.Float(), nullable=False),
+    sa.Column('average', sa.Float(), nullable=False),
+    sa.Column('maximum', sa.Float(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('resolution', 'bucket')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('latency_rollups')
+    op.drop_table('latency_samples')
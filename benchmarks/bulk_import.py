@@ -0,0 +1,98 @@
+"""
+Throughput of the bulk import and export of `ClubDigital.cli`.
+
+Writes a synthetic file with projects and one with users, imports both into an empty database, imports the users a
+second time with every tenth row changed and exports them again. With `--trace-memory` the peak of the Python heap
+is measured with tracemalloc, it should not grow with the number of rows. Tracing slows the runs down considerably.
+
+    poetry run python benchmarks/bulk_import.py --users 100000 --format csv
+"""
+import argparse
+import io
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from loguru import logger  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from ClubDigital import cli, database, models  # noqa: E402
+
+
+def synthetic_projects(count: int):
+    for i in range(count):
+        yield {'name': f'project-{i}', 'description': f'Beschreibung von Projekt {i}', 'color': '10ff10',
+               'role': 10 ** 16 + i, 'leader_role': 2 * 10 ** 16 + i, 'leader': None}
+
+
+def synthetic_users(count: int, projects: int, changed_every: int = 0):
+    for i in range(count):
+        changed = changed_every and i % changed_every == 0
+        yield {'dc_id': 10 ** 17 + i, 'username': f'member-{i}', 'project': f'project-{(i + changed) % projects}',
+               'birth_year': 2008 + i % 6, 'class_name': f'{5 + i % 8}{"abc"[i % 3]}'}
+
+
+def write(path: pathlib.Path, fmt: str, table: str, rows) -> pathlib.Path:
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        cli.write_rows(file, fmt, cli.TABLES[table].columns, rows)
+    return path
+
+
+def measure(label: str, rows: int, trace_memory: bool, func, *args):
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    duration = time.perf_counter() - start
+    report = f'{label:>16}: {rows:7d} rows in {duration:6.2f} s, {rows / duration:8.0f} rows/s'
+    if trace_memory:
+        report += f', heap peak {tracemalloc.get_traced_memory()[1] / 2 ** 20:5.1f} MiB'
+        tracemalloc.stop()
+    print(f'{report}  {result}')
+
+
+def run_import(engine, table: str, path: pathlib.Path, fmt: str, chunk_size: int, dry_run: bool = False):
+    with Session(engine) as session, open(path, newline='', encoding='utf-8') as file:
+        diff = io.StringIO() if dry_run else None
+        result = cli.import_rows(session, cli.TABLES[table], cli.read_rows(file, fmt), chunk_size, diff, dry_run)
+    return result
+
+
+def run_export(engine, table: str, path: pathlib.Path, fmt: str, chunk_size: int):
+    with Session(engine) as session, open(path, 'w', newline='', encoding='utf-8') as file:
+        return cli.export_rows(session, cli.TABLES[table], file, fmt, chunk_size)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--projects', type=int, default=500)
+    parser.add_argument('--format', choices=cli.FORMATS, default='csv')
+    parser.add_argument('--chunk-size', type=int, default=cli.CHUNK_SIZE)
+    parser.add_argument('--trace-memory', action='store_true', help='Measure the peak of the Python heap.')
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level='ERROR')
+
+    directory = pathlib.Path(tempfile.mkdtemp())
+    engine = database.create_engine(f'sqlite:///{directory}/db.sqlite3')
+    models.base.setup(engine)
+    projects = write(directory / f'projects.{args.format}', args.format, 'projects', synthetic_projects(args.projects))
+    users = write(directory / f'users.{args.format}', args.format, 'users', synthetic_users(args.users, args.projects))
+    changed = write(directory / f'changed.{args.format}', args.format, 'users',
+                    synthetic_users(args.users, args.projects, changed_every=10))
+    print(f'{args.users} users, {args.projects} projects, {args.format}, chunks of {args.chunk_size} rows')
+
+    trace = args.trace_memory
+    measure('import projects', args.projects, trace, run_import, engine, 'projects', projects, args.format,
+            args.chunk_size)
+    measure('import users', args.users, trace, run_import, engine, 'users', users, args.format, args.chunk_size)
+    measure('dry run', args.users, trace, run_import, engine, 'users', changed, args.format, args.chunk_size, True)
+    measure('update users', args.users, trace, run_import, engine, 'users', changed, args.format, args.chunk_size)
+    measure('export users', args.users, trace, run_export, engine, 'users', directory / f'export.{args.format}',
+            args.format, args.chunk_size)
+    engine.dispose()
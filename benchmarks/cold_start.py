@@ -0,0 +1,68 @@
+"""
+Measures the cold start time of the bot modules.
+
+Every module is imported in a fresh interpreter, so nothing is cached between the measurements. For the cogs the
+time is reported on top of `ClubDigital.bot`, which every cog imports anyway. The slowest direct imports of every module
+are taken from `python -X importtime`.
+
+    poetry run python benchmarks/cold_start.py --runs 5
+"""
+import argparse
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = pathlib.Path(__file__).parent.parent
+COGS = sorted(item.stem for item in (ROOT / 'ClubDigital' / 'cogs').iterdir()
+              if item.suffix == '.py' and not item.stem.startswith('__'))
+
+SNIPPET = '''
+import time
+{base}
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+'''
+
+
+def measure(module: str, base: str, workdir: str) -> float:
+    code = SNIPPET.format(base=f'import {base}' if base else '', module=module)
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=workdir, env=env,
+                            check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, workdir: str, count: int = 3) -> list[tuple[float, str]]:
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], capture_output=True,
+                            text=True, cwd=workdir, env=env, check=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # The nesting of an import is shown by two spaces per level.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            imports.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    # The bot opens `../db.sqlite3`, so the modules are imported inside a throwaway directory.
+    workdir = pathlib.Path(tempfile.mkdtemp()) / 'work'
+    workdir.mkdir()
+
+    targets = [('ClubDigital.bot', None)] + [(f'ClubDigital.cogs.{cog}', 'ClubDigital.bot') for cog in COGS]
+    for module, base in targets:
+        times = [measure(module, base, str(workdir)) for _ in range(args.runs)]
+        top = ', '.join(f'{name} {seconds * 1000:.0f} ms' for seconds, name in slowest_imports(module, str(workdir)))
+        print(f'{module:<28} {statistics.median(times) * 1000:8.1f} ms   ({top})')
@@ -0,0 +1,221 @@
+"""
+A local stand-in for the Discord gateway and HTTP API.
+
+`FakeHTTPClient` answers the REST calls of pycord with synthetic payloads and feeds the matching gateway events
+(role created, member updated, ...) back into the connection state, like Discord would. `FakeDiscord` builds
+synthetic guilds, members and messages, so the bot can be driven without a token or a network connection.
+
+The members of the guild are kept on the "server side" in `FakeHTTPClient.members`, so they can be chunked over the
+gateway or fetched with the REST API, also when the bot does not cache them.
+"""
+import asyncio
+import bisect
+import collections
+import datetime
+import itertools
+import json
+import re
+import types
+
+import discord
+from discord.http import HTTPClient, Route
+
+GUILD_ID = 10 ** 17
+CHANNEL_ID = GUILD_ID + 1
+BOT_ID = GUILD_ID + 2
+_snowflakes = itertools.count(2 * 10 ** 17)
+
+
+def snowflake() -> int:
+    return next(_snowflakes)
+
+
+def user_payload(user_id: int, name: str, bot: bool = False) -> dict:
+    return {'id': str(user_id), 'username': name, 'discriminator': '0000', 'avatar': None, 'bot': bot}
+
+
+def member_payload(user: dict, roles: list[int] = ()) -> dict:
+    return {'user': user, 'roles': [str(role) for role in roles], 'joined_at': '2022-09-01T00:00:00+00:00',
+            'deaf': False, 'mute': False, 'nick': None}
+
+
+def role_payload(role_id: int, name: str, position: int = 1, **fields) -> dict:
+    return {'id': str(role_id), 'name': name, 'color': fields.get('colour', fields.get('color', 0)),
+            'hoist': fields.get('hoist', False), 'position': position, 'permissions': '0', 'managed': False,
+            'mentionable': fields.get('mentionable', False)}
+
+
+class FakeHTTPClient(HTTPClient):
+    """
+    Answers the requests of pycord locally.
+
+    `latency` simulates the round trip to Discord. The number of calls is counted per route in `calls`.
+    """
+    def __init__(self, state_getter, latency: float = 0.0):
+        super().__init__()
+        self._state = state_getter
+        self.latency = latency
+        self.calls: collections.Counter = collections.Counter()
+        self.members: dict[int, dict] = {}
+        # The member ids in ascending order, for the pagination of `GET /guilds/{guild_id}/members`.
+        self.member_ids: list[int] = []
+
+    def add_member(self, data: dict):
+        user_id = int(data['user']['id'])
+        if user_id not in self.members:
+            bisect.insort(self.member_ids, user_id)
+        self.members[user_id] = data
+
+    def reset(self):
+        self.calls.clear()
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    async def request(self, route: Route, *, files=None, form=None, **kwargs):
+        self.calls[f'{route.method} {route.path}'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        name = re.sub(r'[{}]', '', route.path.strip('/').replace('/', '_'))
+        handler = getattr(self, f'_{route.method.lower()}_{name}', None)
+        if handler is None:
+            return None
+        payload = kwargs.get('json', kwargs.get('params'))
+        if payload is None and form:
+            payload = json.loads(next(item['value'] for item in form if item['name'] == 'payload_json'))
+        return handler(route, payload or {})
+
+    def _dispatch(self, event: str, data: dict):
+        """Delivers a gateway event after the current request returned, like the real gateway would."""
+        asyncio.get_running_loop().call_soon(self._state().parsers[event], data)
+
+    @staticmethod
+    def _ids(route: Route) -> list[int]:
+        return [int(i) for i in re.findall(r'/(\d+)', route.url)]
+
+    def _post_channels_channel_id_messages(self, route: Route, payload: dict) -> dict:
+        state = self._state()
+        return {'id': str(snowflake()), 'channel_id': str(route.channel_id), 'guild_id': str(GUILD_ID),
+                'author': user_payload(state.self_id, 'Club-Digital', bot=True), 'content': payload.get('content') or '',
+                'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(), 'edited_timestamp': None,
+                'tts': False, 'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [],
+                'embeds': payload.get('embeds', []), 'pinned': False, 'type': 0}
+
+    def _post_guilds_guild_id_roles(self, route: Route, payload: dict) -> dict:
+        role = role_payload(snowflake(), payload.get('name', 'new role'), **payload)
+        self._dispatch('GUILD_ROLE_CREATE', {'guild_id': str(route.guild_id), 'role': role})
+        return role
+
+    def _delete_guilds_guild_id_roles_role_id(self, route: Route, payload: dict):
+        self._dispatch('GUILD_ROLE_DELETE', {'guild_id': str(route.guild_id), 'role_id': str(self._ids(route)[-1])})
+
+    def _get_guilds_guild_id_members(self, route: Route, params: dict) -> list[dict]:
+        start = bisect.bisect_right(self.member_ids, int(params.get('after', 0)))
+        return [self.members[user_id] for user_id in self.member_ids[start:start + int(params.get('limit', 1))]]
+
+    def _patch_guilds_guild_id_members_user_id(self, route: Route, payload: dict) -> dict:
+        current = self.members[self._ids(route)[-1]]
+        roles = payload.get('roles', current['roles'])
+        data = member_payload(current['user'], [int(role) for role in roles])
+        self.add_member(data)
+        self._dispatch('GUILD_MEMBER_UPDATE', dict(data, guild_id=str(route.guild_id)))
+        return data
+
+    def _put_guilds_guild_id_members_user_id_roles_role_id(self, route: Route, payload: dict):
+        guild_id, user_id, role_id = self._ids(route)[-3:]
+        current = self.members[user_id]
+        data = member_payload(current['user'], [int(role) for role in current['roles']] + [role_id])
+        self.add_member(data)
+        self._dispatch('GUILD_MEMBER_UPDATE', dict(data, guild_id=str(guild_id)))
+
+
+class FakeDiscord:
+    """Connects a bot to the fake HTTP client and fills its cache with a synthetic guild."""
+    def __init__(self, bot: discord.Client, http_latency: float = 0.0, gateway_latency: float = 0.042):
+        self.bot = bot
+        self.http = FakeHTTPClient(lambda: bot._connection, http_latency)
+        bot.http = self.http
+        bot._connection.http = self.http
+        # `Client.latency` reads the heartbeat latency of the websocket.
+        bot.ws = types.SimpleNamespace(latency=gateway_latency, request_chunks=self._request_chunks)
+        self.state = bot._connection
+        self.state.user = discord.ClientUser(state=self.state, data=user_payload(BOT_ID, 'Club-Digital', bot=True))
+        self.guild: discord.Guild | None = None
+        self.guild_data: dict | None = None
+
+    def populate(self, members: int) -> dict:
+        """Creates the guild with `members` members on the server side and returns its GUILD_CREATE payload."""
+        self.http.add_member(member_payload(user_payload(BOT_ID, 'Club-Digital', bot=True)))
+        for i in range(members):
+            self.http.add_member(member_payload(user_payload(GUILD_ID + 1000 + i, f'member-{i}')))
+        self.guild_data = {
+            'id': str(GUILD_ID), 'name': 'Club-Digital', 'owner_id': str(GUILD_ID + 1000), 'member_count': members + 1,
+            'roles': [role_payload(GUILD_ID, '@everyone', position=0)],
+            'channels': [{'id': str(CHANNEL_ID), 'type': 0, 'name': 'general', 'position': 0,
+                          'permission_overwrites': []}],
+            'members': list(self.http.members.values()), 'emojis': [], 'stickers': [], 'features': [],
+            'large': members > 250,
+        }
+        return self.guild_data
+
+    def create_guild(self, members: int) -> discord.Guild:
+        """Adds the guild with all members to the cache of the bot, as if it had been chunked."""
+        self.guild = self.state._add_guild_from_data(self.populate(members))
+        return self.guild
+
+    def connect(self):
+        """
+        Plays the READY and GUILD_CREATE events of a fresh connection for the guild of `populate`.
+
+        Like for a real bot, GUILD_CREATE only contains the bot itself as member, the other members have to be
+        requested with `guild.chunk()` (the bot does this itself with `chunk_guilds_at_startup`) or fetched.
+        """
+        data = self.guild_data
+        ready = {'user': user_payload(BOT_ID, 'Club-Digital', bot=True), 'session_id': 'fake',
+                 'application': {'id': str(BOT_ID), 'flags': 0}, 'guilds': [{'id': str(GUILD_ID), 'unavailable': True}]}
+        self.state.parse_ready(ready)
+        self.state.parse_guild_create(dict(data, members=data['members'][:1]))
+        self.guild = self.state._get_guild(GUILD_ID)
+
+    async def _request_chunks(self, guild_id: int, query: str | None = None, *, limit: int, user_ids=None,
+                              presences: bool = False, nonce: str | None = None):
+        """Answers a chunk request with GUILD_MEMBERS_CHUNK events of 1000 members, like the gateway."""
+        members = list(self.http.members.values())
+        chunks = [members[i:i + 1000] for i in range(0, len(members), 1000)]
+
+        async def send():
+            for index, chunk in enumerate(chunks):
+                self.state.parse_guild_members_chunk({'guild_id': str(guild_id), 'members': chunk, 'nonce': nonce,
+                                                      'chunk_index': index, 'chunk_count': len(chunks)})
+                await asyncio.sleep(0)
+        asyncio.create_task(send())
+
+    def join(self, first: int, count: int):
+        """Lets `count` new members join the guild, like the gateway does during a raid."""
+        for i in range(first, first + count):
+            data = member_payload(user_payload(GUILD_ID + 1000 + i, f'member-{i}'))
+            self.http.add_member(data)
+            self.state.parse_guild_member_add(dict(data, guild_id=str(GUILD_ID)))
+
+    def member(self, index: int) -> discord.Member:
+        """The member from the cache of the bot, or from the server side, if the bot does not cache it."""
+        member = self.guild.get_member(GUILD_ID + 1000 + index)
+        if member is None:
+            member = discord.Member(data=self.http.members[GUILD_ID + 1000 + index], guild=self.guild,
+                                    state=self.state)
+        return member
+
+    def message(self, content: str, author: int = 0) -> discord.Message:
+        """Creates a message in the general channel, mentions in `content` carry the member data, like on Discord."""
+        mentions = []
+        for user_id in re.findall(r'<@!?(\d+)>', content):
+            data = self.http.members[int(user_id)]
+            mentions.append(dict(data['user'], member={key: value for key, value in data.items() if key != 'user'}))
+        data = {'id': str(snowflake()), 'channel_id': str(CHANNEL_ID), 'guild_id': str(GUILD_ID),
+                'author': user_payload(self.member(author).id, self.member(author).name),
+                'member': member_payload(user_payload(self.member(author).id, self.member(author).name)),
+                'content': content, 'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'edited_timestamp': None, 'tts': False, 'mention_everyone': False, 'mentions': mentions,
+                'mention_roles': [], 'attachments': [], 'embeds': [], 'pinned': False, 'type': 0}
+        return self.state.create_message(channel=self.guild.get_channel(CHANNEL_ID), data=data)
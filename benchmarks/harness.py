@@ -0,0 +1,207 @@
+"""
+Offline benchmark of ProjektBot with the Project, Members and Stats cogs.
+
+The bot is driven through the fake gateway and HTTP API of `fakediscord`, so no token is needed. The scenarios run
+one after another on the same database and the results are printed as JSON, e.g. to compare them between commits:
+
+    poetry run python benchmarks/harness.py --members 10000 --projects 500 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+sys.path.insert(0, str(pathlib.Path(__file__).parent))
+
+# The bot works on a throwaway database.
+os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/db.sqlite3'
+
+import discord  # noqa: E402
+from loguru import logger  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from ClubDigital import models, charts, database, search  # noqa: E402
+from ClubDigital.bot import ProjektBot  # noqa: E402
+from fakediscord import FakeDiscord  # noqa: E402
+
+EXTENSIONS = ['ClubDigital.cogs.project', 'ClubDigital.cogs.members', 'ClubDigital.cogs.stats']
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.queries = QueryCounter()
+        intents = discord.Intents.default()
+        intents.members = True
+        intents.message_content = True
+        self.bot = ProjektBot(command_prefix='!', intents=intents)
+        self.bot.load_extensions(*EXTENSIONS)
+        self.discord = FakeDiscord(self.bot, http_latency=args.http_latency)
+        self.discord.create_guild(args.members)
+
+    async def measure(self, name: str, operations, unit: str = 'operations') -> dict:
+        """Runs the coroutine functions in `operations` one after another and collects the statistics."""
+        latencies = []
+        self.queries.count = 0
+        self.discord.http.reset()
+        start = time.perf_counter()
+        for operation in operations:
+            begin = time.perf_counter()
+            await operation()
+            latencies.append(time.perf_counter() - begin)
+        duration = time.perf_counter() - start
+        # Let the fake gateway deliver the events of the last requests.
+        await asyncio.sleep(0)
+        result = {
+            'scenario': name,
+            'operations': len(latencies),
+            'unit': unit,
+            'seconds': round(duration, 6),
+            'throughput': round(len(latencies) / duration, 3),
+            'p50_ms': round(statistics.median(latencies) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+            'db_queries': self.queries.count,
+            'db_queries_per_operation': round(self.queries.count / len(latencies), 2),
+            'http_calls': dict(self.discord.http.calls),
+        }
+        logger.info(f'{name}: {result["throughput"]} {unit}/s, p99 {result["p99_ms"]} ms')
+        return result
+
+    def command(self, content: str, author: int = 0):
+        async def run():
+            await self.bot.process_commands(self.discord.message(content, author))
+        return run
+
+    def prepare_projects(self):
+        """Creates the projects with members and a repository each, directly in the database."""
+        with Session(database.engine) as session:
+            session.execute(insert(models.Project.__table__), [
+                {'name': f'project-{i}', 'description': f'Beschreibung von Projekt {i}', 'role': 10 ** 16 + i,
+                 'leader_role': 2 * 10 ** 16 + i, 'color': '10ff10'} for i in range(self.args.projects)])
+            session.execute(insert(models.Repo.__table__), [
+                {'project': i + 1, 'label': 'GitHub', 'link': f'github.com/club-digital/project-{i}'}
+                for i in range(self.args.projects)])
+            members = min(self.args.members, self.args.projects * 5)
+            for i in range(members):
+                session.query(models.User).filter_by(dc_id=self.discord.member(i).id) \
+                    .update({'project_id': i % self.args.projects + 1})
+            session.commit()
+            # The rows bypassed the cog, so its name index has to be rebuilt.
+            self.bot.get_cog('Project').index = search.ProjectIndex.load(session)
+
+    async def member_sync(self) -> dict:
+        return await self.measure('member_sync', [self.bot.on_ready], unit='syncs') | {'members': self.args.members}
+
+    async def join_burst(self) -> dict:
+        """Lets `--join-burst` members join at once and waits until all of them are written."""
+        cog = self.bot.get_cog('Members')
+        first = self.args.members
+
+        async def burst():
+            nonlocal first
+            self.discord.join(first, self.args.join_burst)
+            first += self.args.join_burst
+            # The listeners run as tasks, they queue the joins on their first step.
+            await asyncio.sleep(0)
+            await cog.joins.flush()
+        return await self.measure('join_burst', [burst] * self.args.repeat, unit='bursts') \
+            | {'members_per_burst': self.args.join_burst}
+
+    async def project_ls(self) -> dict:
+        self.prepare_projects()
+        return await self.measure('project_ls', [self.command('!project ls')] * self.args.repeat) \
+            | {'projects': self.args.projects}
+
+    async def mass_join(self) -> dict:
+        count = min(self.args.join_users, self.args.members)
+        mentions = ' '.join(f'<@{self.discord.member(i).id}>' for i in range(count))
+        commands = [self.command(f'!project join project-{i % self.args.projects} {mentions}')
+                    for i in range(self.args.repeat)]
+        return await self.measure('mass_join', commands) | {'users_per_join': count}
+
+    async def ping(self) -> dict:
+        stats = self.bot.get_cog('Stats')
+        now = time.time_ns() // 1_000_000
+        for i in range(stats.ping_stats.capacity):
+            stats.ping_stats.append(40 + i % 17, now - (stats.ping_stats.capacity - i) * 1000)
+
+        async def new_sample():
+            # Every call sees a new sample, so the chart has to be drawn again.
+            stats.ping_stats.append(42)
+            await self.command('!ping')()
+        uncached = await self.measure('ping', [new_sample] * self.args.repeat)
+        cached = await self.measure('ping_cached', [self.command('!ping')] * self.args.repeat)
+        return [uncached | {'samples': len(stats.ping_stats)}, cached | {'samples': len(stats.ping_stats)}]
+
+    async def reload(self) -> list[dict]:
+        """Reloads every extension, while the state that the other scenarios built up is in memory."""
+        stats = self.bot.get_cog('Stats')
+        samples, projects = len(stats.ping_stats), len(self.bot.get_cog('Project').index.projects)
+        results = []
+        for name in EXTENSIONS:
+            async def reload(name=name):
+                self.bot.reload_extension(name)
+            results.append(await self.measure(f'reload_{name.rsplit(".", 1)[-1]}', [reload] * self.args.repeat,
+                                              unit='reloads'))
+        assert len(self.bot.get_cog('Stats').ping_stats) == samples, 'The ping history was lost.'
+        assert len(self.bot.get_cog('Project').index.projects) == projects, 'The project index was lost.'
+        return results
+
+    async def run(self) -> list[dict]:
+        results = [await self.member_sync(), await self.join_burst(), await self.project_ls(), await self.mass_join()]
+        results.extend(await self.ping())
+        results.extend(await self.reload())
+        return results
+
+
+async def main(args):
+    harness = Harness(args)
+    try:
+        results = await harness.run()
+    finally:
+        charts.shutdown()
+    report = json.dumps({'python': sys.version.split()[0], 'pycord': discord.__version__, 'results': results},
+                        indent=2)
+    if args.output:
+        pathlib.Path(args.output).write_text(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--members', type=int, default=10_000)
+    parser.add_argument('--projects', type=int, default=500)
+    parser.add_argument('--join-users', type=int, default=50)
+    parser.add_argument('--join-burst', type=int, default=500, help='How many members join at once.')
+    parser.add_argument('--repeat', type=int, default=20, help='How often every command is sent.')
+    parser.add_argument('--http-latency', type=float, default=0.0, help='Simulated round trip to Discord in seconds.')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+    parser.add_argument('--verbose', action='store_true', help='Show the log of the bot.')
+    arguments = parser.parse_args()
+    if not arguments.verbose:
+        logger.remove()
+        logger.add(sys.stderr, level='INFO', filter=__name__)
+    asyncio.run(main(arguments))
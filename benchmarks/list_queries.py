@@ -0,0 +1,82 @@
+"""
+Checks that `!project ls` builds its embeds from a single SELECT, no matter how many projects there are.
+
+Creates projects with repositories, members and a leader each, runs `Project._list_embeds` and counts the statements
+that reach the database. The script fails, if the listing needs more than one SELECT or misses data.
+
+    poetry run python benchmarks/list_queries.py --projects 25
+"""
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+# The check works on a throwaway database.
+os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/db.sqlite3'
+
+from loguru import logger  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from ClubDigital import database, models  # noqa: E402
+from ClubDigital.cogs.project import Project  # noqa: E402
+
+
+def prepare(projects: int, members: int):
+    models.base.setup(database.engine)
+    with Session(database.engine) as session:
+        for i in range(projects):
+            project = models.Project(f'project-{i}', f'Beschreibung {i}', 10 ** 16 + i, 2 * 10 ** 16 + i)
+            session.add(project)
+            session.flush()
+            session.add_all([models.Repo(project.id, label, f'github.com/project-{i}/{label}')
+                             for label in ('GitHub', 'Wiki')])
+            users = [models.User(f'member-{i}-{j}', 10 ** 17 + i * members + j) for j in range(members)]
+            for user in users:
+                user.project_id = project.id
+            session.add_all(users)
+            session.flush()
+            project.leader = users[0].id
+        session.commit()
+
+
+def count_selects(projects: int, members: int) -> tuple[int, float]:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(database.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        with Session(database.engine) as session:
+            start = time.perf_counter()
+            embeds = Project._list_embeds(session)
+            duration = time.perf_counter() - start
+    finally:
+        event.remove(database.engine, 'before_cursor_execute', before_cursor_execute)
+
+    assert len(embeds) == projects, f'{len(embeds)} embeds for {projects} projects'
+    for embed in embeds:
+        fields = {field.name: field.value for field in embed.fields}
+        assert fields['Repositorys'].count('http://') == 2, fields
+        # The field is called "Mitglied" or "Mitglieder", depending on the number of members.
+        assert next(value for name, value in fields.items() if name.startswith('Mitglied')).count('\n') \
+            == members - 1, fields
+        assert fields['Leiter'].startswith('member-'), fields
+    selects = [statement for statement in statements if database._statement_type(statement) == 'SELECT']
+    assert len(selects) == 1, f'{len(selects)} SELECTs instead of one:\n' + '\n'.join(selects)
+    return len(selects), duration
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', type=int, default=25)
+    parser.add_argument('--members', type=int, default=5, help='Members per project, the first one leads it.')
+    args = parser.parse_args()
+    logger.remove()
+    prepare(args.projects, args.members)
+    count, seconds = count_selects(args.projects, args.members)
+    print(f'{args.projects} projects with {args.members} members: {count} SELECT in {seconds * 1000:.1f} ms')
@@ -0,0 +1,130 @@
+"""
+Time to ready and memory of the member cache modes (`MEMBER_CACHE=eager|lazy|never`) on a large synthetic guild.
+
+Every mode runs in a fresh process. The fake gateway plays READY and GUILD_CREATE, chunks the guild on request and
+answers `GET /guilds/{guild_id}/members`. Reported are the time until the ready event, the time until the member sync
+of `on_ready` finished, the growth of the resident set size and its peak, and the number of cached members. Afterwards a
+`!project join`, a role change made outside the bot and a member leaving the guild check that the member handling still
+works in the mode. The number of cached members is reported again after the command, the lazy mode chunks the guild in
+the background once the first command is used.
+
+    poetry run python benchmarks/member_cache.py --members 100000
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = pathlib.Path(__file__).parent
+MODES = ('eager', 'lazy', 'never')
+
+
+def rss() -> int:
+    """The current resident set size in bytes."""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+async def child(mode: str, members: int) -> dict:
+    sys.path.insert(0, str(ROOT.parent))
+    sys.path.insert(0, str(ROOT))
+    os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/db.sqlite3'
+
+    import discord
+    from loguru import logger
+    from sqlalchemy.orm import Session
+
+    from ClubDigital import database, models
+    from ClubDigital.bot import ProjektBot
+    from fakediscord import FakeDiscord, role_payload
+
+    logger.remove()
+    synced = asyncio.get_running_loop().create_future()
+
+    class Bot(ProjektBot):
+        async def on_ready(self):
+            await super().on_ready()
+            synced.set_result(time.perf_counter())
+
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    # The fake gateway sends the only guild at once, pycord would otherwise wait two seconds for more.
+    bot = Bot(command_prefix='!', intents=intents, member_cache=mode, guild_ready_timeout=0.01,
+              auto_sync_commands=False)
+    bot.load_extensions('ClubDigital.cogs.project', 'ClubDigital.cogs.members')
+    fake = FakeDiscord(bot)
+    # The members on the server side of the fake are not part of the measurement.
+    fake.populate(members)
+    gc.collect()
+    baseline = rss()
+
+    start = time.perf_counter()
+    fake.connect()
+    await bot.wait_for('ready')
+    ready = time.perf_counter()
+    await synced
+    gc.collect()
+    result = {'mode': mode, 'members': members, 'ready_s': round(ready - start, 3),
+              'synced_s': round(synced.result() - start, 3), 'rss_mib': round((rss() - baseline) / 2 ** 20, 1),
+              'peak_rss_mib': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+              'cached_members': len(fake.guild.members)}
+
+    with Session(database.engine) as session:
+        result['users'] = session.query(models.User).count()
+        session.add(models.Project('benchmark', '', 10 ** 16, 2 * 10 ** 16))
+        session.commit()
+    for role_id in (10 ** 16, 2 * 10 ** 16):
+        fake.state.parsers['GUILD_ROLE_CREATE']({'guild_id': str(fake.guild.id),
+                                                 'role': role_payload(role_id, 'benchmark')})
+    member = fake.member(members - 1)
+    await bot.process_commands(fake.message(f'!project join benchmark <@{member.id}>'))
+    deadline = time.perf_counter() + 60
+    while mode == 'lazy' and not fake.guild.chunked and time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+    result['cached_after_command'] = len(fake.guild.members)
+    user = fake.member(members - 2)
+    fake.state.parsers['GUILD_MEMBER_UPDATE'](dict(fake.http.members[user.id], roles=[str(10 ** 16)],
+                                                    guild_id=str(fake.guild.id)))
+    await asyncio.sleep(0.1)
+    with Session(database.engine) as session:
+        project = session.query(models.Project).filter_by(name='benchmark').one()
+        result['joined'] = sorted(u.dc_id for u in project.users) == sorted([user.id, member.id])
+    fake.state.parsers['GUILD_MEMBER_REMOVE']({'guild_id': str(fake.guild.id),
+                                               'user': fake.http.members[member.id]['user']})
+    await asyncio.sleep(0.1)
+    with Session(database.engine) as session:
+        project = session.query(models.Project).filter_by(name='benchmark').one()
+        result['left'] = [u.dc_id for u in project.users] == [user.id]
+    return result
+
+
+def run(mode: str, members: int) -> dict:
+    output = subprocess.run([sys.executable, __file__, '--child', mode, '--members', str(members)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--members', type=int, default=100_000)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.child, args.members))))
+        sys.exit()
+
+    print(f'{"mode":>6} {"ready":>8} {"synced":>8} {"RSS":>9} {"peak RSS":>9} {"cached":>8} {"after cmd":>9}  works')
+    for mode in args.modes:
+        r = run(mode, args.members)
+        works = r['users'] == args.members and r['joined'] and r['left']
+        print(f'{mode:>6} {r["ready_s"]:7.2f}s {r["synced_s"]:7.2f}s {r["rss_mib"]:6.0f} MiB '
+              f'{r["peak_rss_mib"]:5.0f} MiB {r["cached_members"]:8d} {r["cached_after_command"]:9d}  {works}')
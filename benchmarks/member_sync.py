@@ -0,0 +1,77 @@
+"""
+Benchmark for the member sync that runs in `ProjektBot.on_ready`.
+
+Compares the old per-member lookup with the reconciliation of `ClubDigital.members` on a synthetic guild. Half of the
+members are already known to the database, the other half has to be inserted. A second reconciliation with every tenth
+member renamed shows the cost of a reconnect, when the members are already known.
+
+    poetry run python benchmarks/member_sync.py --members 100000
+"""
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from loguru import logger  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from ClubDigital import models, database  # noqa: E402
+from ClubDigital.members import reconcile_members  # noqa: E402
+
+
+def synthetic_members(count: int, renamed_every: int = 0) -> list[tuple[str, int, list[int]]]:
+    return [(f'member-{i}{"-renamed" if renamed_every and i % renamed_every == 0 else ""}', 10 ** 17 + i, [])
+            for i in range(count)]
+
+
+def prepare(members: list[tuple[str, int]]):
+    engine = database.create_engine(f'sqlite:///{tempfile.mkdtemp()}/db.sqlite3')
+    models.base.setup(engine)
+    with Session(engine) as session:
+        session.execute(insert(models.User.__table__),
+                        [{'username': name, 'dc_id': dc_id} for name, dc_id, _ in members[::2]])
+        session.commit()
+    return engine
+
+
+def legacy_sync(session: Session, members: list[tuple[str, int, list[int]]]) -> str:
+    added = 0
+    for name, dc_id, _ in members:
+        if not session.query(models.User).filter_by(username=name).first():
+            session.add(models.User(name, dc_id))
+            added += 1
+    session.commit()
+    return f'{added} added'
+
+
+def reconcile(session: Session, members: list[tuple[str, int, list[int]]]) -> str:
+    result = reconcile_members(session, members, ())
+    return f'{result.added} added, {result.renamed} renamed'
+
+
+def measure(label: str, func, members, engine=None):
+    engine = engine or prepare(members)
+    with Session(engine) as session:
+        start = time.perf_counter()
+        result = func(session, members)
+        duration = time.perf_counter() - start
+    print(f'{label:>9}: {duration:8.2f} s  {len(members) / duration:10.0f} members/s  {result}')
+    return engine
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--members', type=int, default=100_000)
+    parser.add_argument('--skip-legacy', action='store_true', help='Only run the reconciliation.')
+    args = parser.parse_args()
+    logger.remove()
+
+    guild = synthetic_members(args.members)
+    if not args.skip_legacy:
+        measure('legacy', legacy_sync, guild)
+    engine = measure('reconcile', reconcile, guild)
+    measure('reconnect', reconcile, synthetic_members(args.members, renamed_every=10), engine)
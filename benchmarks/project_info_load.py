@@ -0,0 +1,117 @@
+"""
+Load test for the database layer of the Project cog.
+
+Fires concurrent `!project info` calls while another task keeps writing to the database and reports the
+latency percentiles of the info calls together with the lag of the event loop. Because every query runs on the
+database thread, the event loop lag has to stay close to zero, no matter how many writes are going on.
+
+The writer no longer queues behind the reads, but the latency of the info calls does not improve with the reader
+pool: building the ORM objects and the embed holds the GIL, so the reader threads take turns instead of running in
+parallel. More threads (`DATABASE_READERS`) mostly add event loop lag.
+
+    poetry run python benchmarks/project_info_load.py --calls 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+# The cog works on a throwaway database.
+os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/db.sqlite3'
+
+from loguru import logger  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from ClubDigital import models, database, members  # noqa: E402
+from ClubDigital.cogs.project import Project  # noqa: E402
+
+
+class FakeContext:
+    def __init__(self):
+        self.prj = None
+        self.sent = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def prepare(projects: int, users: int):
+    models.base.setup(database.engine)
+    with Session(database.engine) as session:
+        for i in range(projects):
+            session.add(models.Project(f'project-{i}', f'Beschreibung {i}', i + 1, projects + i + 1))
+        session.flush()
+        for i in range(users):
+            user = models.User(f'user-{i}', 10 ** 17 + i)
+            user.project_id = i % projects + 1
+            session.add(user)
+        session.commit()
+
+
+async def writer(stop: asyncio.Event) -> int:
+    writes = 0
+    while not stop.is_set():
+        await database.run_session(database.engine, members.enlist_member, f'writer-{writes}', 10 ** 18 + writes)
+        writes += 1
+    return writes
+
+
+async def loop_lag(stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        samples.append(time.perf_counter() - start - 0.005)
+
+
+async def main(args):
+    prepare(args.projects, args.users)
+    cog = Project(None)
+
+    async def call(i, latencies):
+        ctx = FakeContext()
+        start = time.perf_counter()
+        await cog.info.callback(cog, ctx, f'project-{i % args.projects}')
+        latencies.append(time.perf_counter() - start)
+
+    async def run_calls(latencies):
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def bounded(i):
+            async with semaphore:
+                await call(i, latencies)
+        await asyncio.gather(*[bounded(i) for i in range(args.calls)])
+
+    for label, with_writes in (('read only', False), ('with writes', True)):
+        latencies, lag = [], []
+        stop = asyncio.Event()
+        tasks = [asyncio.create_task(loop_lag(stop, lag))]
+        if with_writes:
+            tasks.append(asyncio.create_task(writer(stop)))
+        await run_calls(latencies)
+        stop.set()
+        results = await asyncio.gather(*tasks)
+        writes = results[1] if with_writes else 0
+        print(f'{label:>12}: p50 {statistics.median(latencies) * 1000:8.2f} ms  '
+              f'p99 {percentile(latencies, 99) * 1000:8.2f} ms  '
+              f'loop lag p99 {percentile(lag, 99) * 1000:6.2f} ms  writes {writes}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--projects', type=int, default=50)
+    parser.add_argument('--users', type=int, default=2000)
+    logger.remove()
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,92 @@
+"""
+Benchmark for the lookups that depend on the schema revision `3b7f0c9d2e18`.
+
+Builds a database with the revision before it, fills it with synthetic users, projects and repositories, measures the
+lookups, migrates the database to the head revision and measures the lookups again.
+
+    poetry run python benchmarks/schema_lookup.py --users 100000
+"""
+import argparse
+import pathlib
+import random
+import sys
+import tempfile
+import time
+
+# Appended, so the `alembic` directory of the repository does not shadow the alembic package.
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+
+ROOT = pathlib.Path(__file__).parent.parent
+PREVIOUS_REVISION = '8e3d2f61a7c5'
+
+
+def alembic_config(url: str) -> Config:
+    config = Config(str(ROOT / 'alembic.ini'))
+    config.set_main_option('script_location', str(ROOT / 'alembic'))
+    config.set_main_option('sqlalchemy.url', url)
+    return config
+
+
+def populate(engine, users: int, projects: int):
+    """Inserts the rows like the bot did before the migration, the Discord IDs as strings."""
+    with engine.begin() as connection:
+        connection.execute(text('INSERT INTO projects (name, description, role, leader_role, color) '
+                                'VALUES (:name, :description, :role, :leader_role, :color)'),
+                           [{'name': f'project-{i}', 'description': '', 'role': 10 ** 16 + i,
+                             'leader_role': 2 * 10 ** 16 + i, 'color': '10ff10'} for i in range(projects)])
+        connection.execute(text('INSERT INTO repos (project, label, link) VALUES (:project, :label, :link)'),
+                           [{'project': i % projects + 1, 'label': 'GitHub', 'link': f'github.com/{i}'}
+                            for i in range(projects * 3)])
+        connection.execute(text('INSERT INTO users (username, dc_id, project_id) VALUES (:username, :dc_id, :project)'),
+                           [{'username': f'member-{i}', 'dc_id': str(10 ** 17 + i),
+                             'project': i % projects + 1 if i % 4 == 0 else None} for i in range(users)])
+
+
+def measure(engine, users: int, projects: int, lookups: int) -> dict[str, float]:
+    rng = random.Random(42)
+    dc_ids = [10 ** 17 + rng.randrange(users) for _ in range(lookups)]
+    project_ids = [rng.randrange(projects) + 1 for _ in range(lookups)]
+    queries = {
+        'user by dc_id': ('SELECT * FROM users WHERE dc_id = :value', dc_ids),
+        'users of project': ('SELECT * FROM users WHERE project_id = :value', project_ids),
+        'repos of project': ('SELECT * FROM repos WHERE project = :value', project_ids),
+    }
+    timings = {}
+    with engine.connect() as connection:
+        for label, (statement, values) in queries.items():
+            statement = text(statement)
+            start = time.perf_counter()
+            for value in values:
+                connection.execute(statement, {'value': value}).all()
+            timings[label] = (time.perf_counter() - start) / len(values)
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--projects', type=int, default=500)
+    parser.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+
+    url = f'sqlite:///{tempfile.mkdtemp()}/db.sqlite3'
+    config = alembic_config(url)
+    command.upgrade(config, PREVIOUS_REVISION)
+    engine = create_engine(url)
+    populate(engine, args.users, args.projects)
+    before = measure(engine, args.users, args.projects, args.lookups)
+
+    start = time.perf_counter()
+    command.upgrade(config, 'head')
+    migration = time.perf_counter() - start
+    engine.dispose()
+    after = measure(engine, args.users, args.projects, args.lookups)
+
+    print(f'{args.users} users, {args.projects} projects, migration took {migration:.2f} s')
+    for label in before:
+        print(f'{label:>18}: {before[label] * 1000:8.3f} ms -> {after[label] * 1000:8.3f} ms '
+              f'({before[label] / after[label]:6.1f}x)')
@@ -0,0 +1,117 @@
+"""
+Soak test of the unit of work of the Project cog: memory has to stay flat, no matter how many commands ran.
+
+The bot works on a synthetic guild through `fakediscord` and runs `!project join`, `!project leave`,
+`!project repo modify` and `!project info` in turns, for different members and projects, so every row of the database
+is loaded again and again. Every `--sample` commands the garbage is collected and the resident set size, the number of
+Python objects, the number of open sessions and the mean of the largest identity map of the sessions since the last
+sample are printed. At the end the growth between the first and the last sample is reported, it should stay within the
+noise.
+
+    poetry run python benchmarks/session_soak.py --commands 1000000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+sys.path.insert(0, str(pathlib.Path(__file__).parent))
+
+os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/db.sqlite3'
+
+import discord  # noqa: E402
+from loguru import logger  # noqa: E402
+from prometheus_client import REGISTRY  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from ClubDigital import database, models, search  # noqa: E402
+from ClubDigital.bot import ProjektBot  # noqa: E402
+from fakediscord import FakeDiscord  # noqa: E402
+
+
+def rss() -> int:
+    """The current resident set size in bytes."""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def metric(name: str, labels: dict) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def commands(fake: FakeDiscord, members: int, projects: int):
+    """The commands of the soak test, endlessly."""
+    i = 0
+    while True:
+        member, project = fake.member(i % members), f'project-{i % projects}'
+        yield f'!project join {project} <@{member.id}>'
+        yield f'!project repo modify {project} GitHub github.com/club-digital/{project}-{i % 7}'
+        yield f'!project info {project}'
+        yield f'!project leave <@{member.id}>'
+        i += 1
+
+
+async def main(args):
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    bot = ProjektBot(command_prefix='!', intents=intents)
+    bot.load_extensions('ClubDigital.cogs.project', 'ClubDigital.cogs.members')
+    fake = FakeDiscord(bot)
+    fake.create_guild(args.members)
+    await bot.on_ready()
+    with Session(database.engine) as session:
+        session.execute(insert(models.Project.__table__), [
+            {'name': f'project-{i}', 'description': f'Beschreibung von Projekt {i}', 'role': 10 ** 16 + i,
+             'leader_role': 2 * 10 ** 16 + i, 'color': '10ff10'} for i in range(args.projects)])
+        session.execute(insert(models.Repo.__table__), [
+            {'project': i + 1, 'label': 'GitHub', 'link': f'github.com/club-digital/project-{i}'}
+            for i in range(args.projects)])
+        session.commit()
+        bot.get_cog('Project').index = search.ProjectIndex.load(session)
+
+    labels = {'engine': 'writer'}
+    print(f'{args.commands} commands, {args.members} members, {args.projects} projects')
+    print(f'{"commands":>9} {"seconds":>8} {"cmd/s":>7} {"RSS":>9} {"objects":>9} {"open":>5} {"identity map":>12}')
+    samples = []
+    sessions = rows = 0.0
+    start = time.perf_counter()
+    for count, content in enumerate(commands(fake, args.members, args.projects), start=1):
+        await bot.process_commands(fake.message(content))
+        if count % args.sample == 0 or count == args.commands:
+            # Let the role updates of the fake gateway arrive.
+            await asyncio.sleep(0)
+            gc.collect()
+            elapsed = time.perf_counter() - start
+            total = metric('bot_database_session_identity_map_count', labels)
+            summed = metric('bot_database_session_identity_map_sum', labels)
+            mean = (summed - rows) / (total - sessions) if total > sessions else 0.0
+            sessions, rows = total, summed
+            samples.append((count, rss(), len(gc.get_objects())))
+            print(f'{count:9d} {elapsed:8.1f} {count / elapsed:7.0f} {samples[-1][1] / 2 ** 20:5.1f} MiB '
+                  f'{samples[-1][2]:9d} {metric("bot_database_sessions_open", labels):5.0f} {mean:12.2f}')
+        if count == args.commands:
+            break
+
+    # The first sample includes the warm up of the caches, so the growth is measured from the second one on.
+    first, last = samples[min(1, len(samples) - 1)], samples[-1]
+    print(f'growth from {first[0]} to {last[0]} commands: {(last[1] - first[1]) / 2 ** 20:+.1f} MiB RSS, '
+          f'{last[2] - first[2]:+d} objects')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=1_000_000)
+    parser.add_argument('--members', type=int, default=5_000)
+    parser.add_argument('--projects', type=int, default=500)
+    parser.add_argument('--sample', type=int, default=50_000, help='Number of commands between two samples.')
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level='ERROR')
+    asyncio.run(main(args))